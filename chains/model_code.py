@@ -1,20 +1,56 @@
 # chains/model7_code.py
+import asyncio
+import json
 import os
 import re
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
 from langchain.prompts import ChatPromptTemplate
-from langchain_google_genai import ChatGoogleGenerativeAI
+from utils.llm_pool import get_llm
+from utils.model_routing import stage_model, escalate
 from utils.load_functions import load_text_file
+from utils.tracing import PARSE, span, add_retry, run_in_context
+from utils.llm_cache import invoke_cached, ainvoke_cached, stream_cached, astream_cached, add_usage
+from utils.code_stream import StreamingCodeWriter
+from utils.code_validator import find_issues, apply_local_fixes, repair_targets, splice
+from utils.code_assembler import assemble_script, extract_function, module_function_names, module_placement
+from utils.code_assembler import library_reference
+from utils.code_assembler import split_module_functions
+from utils.code_template import furnish_function_names, module_skeletons, template_modules
+from utils.plan import BuildingPlan, json_text
+from chains.model_structure_json import get_block_index, extract_json_block
+from chains.model_plan import get_material_table
 
 load_dotenv()
-model_name = os.getenv("MODEL_NAME")
+model_name = stage_model("code")
 code_example = load_text_file("examples/code_example.py")
+# Generated scripts import their utility functions from the runtime library; prompts only get the signatures.
+library_code = load_text_file("runtime/building.py")
+library = library_reference(library_code)
 prompt_path = "prompts/code.txt"
 prompt_text = load_text_file(prompt_path)
 prompt = ChatPromptTemplate.from_template(prompt_text)
+repair_prompt = ChatPromptTemplate.from_template(load_text_file("prompts/code_repair.txt"))
+module_prompt = ChatPromptTemplate.from_template(load_text_file("prompts/code_module.txt"))
+furnish_prompt = ChatPromptTemplate.from_template(load_text_file("prompts/code_furnish.txt"))
+# STREAM_CODE=1 writes the code file while it is generated and syntax-checks each finished function.
+stream_code = os.getenv("STREAM_CODE", "0") == "1"
+# Rounds of targeted re-prompts for the functions the local check still flags (0 = local fixes only).
+code_repair_rounds = int(os.getenv("CODE_REPAIR_ROUNDS", "2"))
+# CODE_MODE=modules writes one function per module (concurrently) and assembles the script locally,
+# so a single broken module can be regenerated with main.py --resume RUN_ID --regenerate CODE.
+# CODE_MODE=template generates each module's shell, passages, stairs and roof locally from the plan
+# and only asks the model for its furniture.
+code_mode = os.getenv("CODE_MODE", "single")
+# Module functions requested at once in CODE_MODE=modules/template (sync pipeline).
+module_workers = int(os.getenv("CODE_MODULE_WORKERS", "4"))
 
-llm = ChatGoogleGenerativeAI(model=model_name, temperature=0.1)
-chain = prompt | llm
+llm = get_llm(model_name, 0.1)
+
+# Pipeline context keys passed to the generate function, in argument order; only the modes that
+# assemble the script from the building plan wait for it.
+STAGE_INPUTS = ("layout", "structure_json", "code_save_path", "material_list") + \
+    (("plan",) if code_mode in ("modules", "template") else ())
 
 def extract_code_block(response: str) -> str:
     match = re.search(r"```(?:python)?\n(.*?)```", response, re.DOTALL)
@@ -30,20 +66,282 @@ def save_code_to_file(code: str, filepath: str) -> None:
     with open(filepath, "w", encoding="utf-8") as f:
         f.write(code)
 
-def generate_code_and_save(layout: str, structure_json: str, save_path: str):
+def code_prompt(layout: str, structure_json: str):
     inputs = {
         "layout": layout,
         "structure_json": structure_json,
+        "library": library,
         "code_example": code_example
     }
-    response = chain.invoke(inputs)
-    content = response.content if hasattr(response, "content") else str(response)
-    code = extract_code_block(content)
+    return prompt.format_messages(**inputs)
+
+def check_code(code: str, material_list: str):
+    """
+    Run the AST validator and apply its local fixes; returns (code, remaining issues).
+    """
+    with span("Validate code", PARSE) as check:
+        issues = find_issues(code, library_code, get_block_index(material_list))
+        code, fixes = apply_local_fixes(code, issues, code_example)
+        for fix in fixes:
+            print(f"[Code Writing] Fixed locally: {fix}")
+        if fixes:
+            issues = find_issues(code, library_code, get_block_index(material_list))
+        check.attrs.update(local_fixes=len(fixes), issues=len(issues))
+    return code, issues
+
+def repair_prompt_for(code: str, segment, problems):
+    _, first, last = segment
+    return repair_prompt.format_messages(issues="\n".join(problems), segment="\n".join(code.split("\n")[first - 1:last]))
+
+def report_issues(issues) -> None:
+    for issue in issues:
+        print(f"Warning: [Code Writing] line {issue['line']}: {issue['message']}")
+
+def repair_model(issues):
+    """The client for the repair prompts: the escalation model when the code stage's own model left problems."""
+    if code_repair_rounds and repair_targets(issues):
+        return escalate(llm, "Code Writing") or llm
+    return llm
+
+def repair_code(code: str, material_list: str):
+    """
+    Validate the script before it is saved. What cannot be fixed locally is re-prompted one function
+    at a time: only the offending function goes to the model, and its answer is spliced back in place.
+    """
+    usage = {}
+    code, issues = check_code(code, material_list)
+    repair_llm = repair_model(issues)
+    for _ in range(code_repair_rounds):
+        targets = repair_targets(issues)
+        if not targets:
+            break
+        # Bottom-up, so splicing a function never moves the lines of the ones still to be repaired.
+        for segment in sorted(targets, key=lambda target: -target[1]):
+            print(f"[Code Writing] Repairing {segment[0]} ({len(targets[segment])} problems)")
+            add_retry()
+            content, repair_usage = invoke_cached(repair_llm, repair_prompt_for(code, segment, targets[segment]))
+            code = splice(code, segment[1], segment[2], extract_code_block(content))
+            usage = add_usage(usage, repair_usage)
+        code, issues = check_code(code, material_list)
+    report_issues(issues)
+    return code, usage
+
+async def arepair_code(code: str, material_list: str):
+    """
+    Same as repair_code, with the functions of one round repaired concurrently.
+    """
+    usage = {}
+    code, issues = check_code(code, material_list)
+    repair_llm = repair_model(issues)
+    for _ in range(code_repair_rounds):
+        targets = repair_targets(issues)
+        if not targets:
+            break
+        segments = sorted(targets, key=lambda target: -target[1])
+        for segment in segments:
+            print(f"[Code Writing] Repairing {segment[0]} ({len(targets[segment])} problems)")
+            add_retry()
+        results = await asyncio.gather(*(ainvoke_cached(repair_llm, repair_prompt_for(code, segment, targets[segment]))
+                                         for segment in segments))
+        for segment, (content, repair_usage) in zip(segments, results):
+            code = splice(code, segment[1], segment[2], extract_code_block(content))
+            usage = add_usage(usage, repair_usage)
+        code, issues = check_code(code, material_list)
+    report_issues(issues)
+    return code, usage
+
+def finish_code(content: str, code: str, usage, repair_usage, save_path: str):
     save_code_to_file(code, save_path)
+    if code != extract_code_block(content):
+        content = f"```python\n{code}\n```"
+    return content, add_usage(usage, repair_usage) if repair_usage else usage
+
+def load_plan(plan: str, material_list: str) -> BuildingPlan:
+    return BuildingPlan.from_compact(plan, get_material_table(material_list))
+
+def module_entries(structure_json: str):
+    """{module code: module entry} of the structure JSON ({} if it does not parse; entries without a code are skipped)."""
+    try:
+        structure = json.loads(extract_json_block(structure_json))
+    except json.JSONDecodeError:
+        return {}
+    modules = structure.get("modules") if isinstance(structure, dict) else None
+    return {entry["code"].strip(): entry for entry in (modules if isinstance(modules, list) else [])
+            if isinstance(entry, dict) and json_text(entry.get("code"))}
+
+def module_info(entries, code: str) -> str:
+    if code in entries:
+        return json.dumps(entries[code], ensure_ascii=False, indent=2)
+    return "No entry for this module; build it in the materials of the neighbouring modules."
+
+def module_prompts(layout: str, structure_json: str, building: BuildingPlan, codes):
+    """
+    {module code: prompt} asking for that module's function only, with its placement taken from the plan.
+    """
+    entries = module_entries(structure_json)
+    names = module_function_names(building)
+    return {code: module_prompt.format_messages(code=code, function_name=names[code], layout=layout,
+                                                placement=module_placement(building, code),
+                                                module_info=module_info(entries, code), library=library,
+                                                code_example=code_example)
+            for code in codes}
+
+def furnish_prompts(structure_json: str, building: BuildingPlan, codes):
+    """
+    {module code: prompt} asking only for the furniture of that module, given its generated skeleton.
+    """
+    entries = module_entries(structure_json)
+    skeletons = module_skeletons(building, entries)
+    names = furnish_function_names(building)
+    return {code: furnish_prompt.format_messages(code=code, furnish_name=names[code], skeleton=skeletons[code],
+                                                 module_info=module_info(entries, code), library=library,
+                                                 code_example=code_example)
+            for code in codes}
+
+def generated_function_names(building: BuildingPlan):
+    """{module code: name of the function the model writes for it} in the current CODE_MODE."""
+    return furnish_function_names(building) if code_mode == "template" else module_function_names(building)
+
+def function_prompts(layout: str, structure_json: str, building: BuildingPlan, codes):
+    if code_mode == "template":
+        return furnish_prompts(structure_json, building, codes)
+    return module_prompts(layout, structure_json, building, codes)
 
+def build_script(building: BuildingPlan, structure_json: str, functions) -> str:
+    """The full script from the model-written functions: as they are, or furnish functions under their skeletons."""
+    if code_mode == "template":
+        functions = template_modules(building, module_skeletons(building, module_entries(structure_json)), functions)
+    return assemble_script(code_example, building, functions)
+
+def module_function(code: str, function_name: str, content: str) -> str:
+    source = extract_function(extract_code_block(content), function_name)
+    if source is None:
+        print(f"Warning: [Code Writing] No function for module {code} in the response; "
+              f"regenerate it with --regenerate {code}.")
+        source = f'def {function_name}(x, y, z):  # Module {code}\n    """Not generated."""'
+    return source
+
+def missing_functions(codes, names, results):
+    """Modules whose response holds no usable function, to be asked again on the escalation model."""
+    return [code for code, (content, _) in zip(codes, results)
+            if extract_function(extract_code_block(content), names[code]) is None]
+
+def merge_retried(codes, results, retried):
+    """results with the retried modules' content replaced, counting the usage of both requests."""
+    return [(retried[code][0], add_usage(usage, retried[code][1])) if code in retried else (content, usage)
+            for code, (content, usage) in zip(codes, results)]
+
+def collect_functions(codes, names, results):
     usage = {}
-    if hasattr(response, "usage_metadata") and response.usage_metadata:
-        usage = response.usage_metadata
-    elif hasattr(response, "response_metadata"):
-        usage = response.response_metadata.get("usage_metadata", {})
-    return content, usage
\ No newline at end of file
+    functions = {}
+    for code, (content, module_usage) in zip(codes, results):
+        functions[code] = module_function(code, names[code], content)
+        usage = add_usage(usage, module_usage)
+    return functions, usage
+
+def generate_functions(layout: str, structure_json: str, building: BuildingPlan, codes, refresh=False):
+    """
+    Generate the functions of the given modules, up to module_workers requests at a time.
+    Returns ({module code: function source}, usage).
+    """
+    names = generated_function_names(building)
+    prompts = function_prompts(layout, structure_json, building, codes)
+    with ThreadPoolExecutor(max_workers=max(1, module_workers)) as pool:
+        def request(client, requested):
+            futures = [run_in_context(pool, invoke_cached, client, prompts[code], None, refresh) for code in requested]
+            return [future.result() for future in futures]
+
+        results = request(llm, codes)
+        missing = missing_functions(codes, names, results)
+        stronger = escalate(llm, "Code Writing") if missing else None
+        if stronger is not None:
+            results = merge_retried(codes, results, dict(zip(missing, request(stronger, missing))))
+    return collect_functions(codes, names, results)
+
+async def agenerate_functions(layout: str, structure_json: str, building: BuildingPlan, codes, refresh=False):
+    names = generated_function_names(building)
+    prompts = function_prompts(layout, structure_json, building, codes)
+    results = await asyncio.gather(*(ainvoke_cached(llm, prompts[code], refresh=refresh) for code in codes))
+    missing = missing_functions(codes, names, results)
+    stronger = escalate(llm, "Code Writing") if missing else None
+    if stronger is not None:
+        retried = await asyncio.gather(*(ainvoke_cached(stronger, prompts[code], refresh=refresh) for code in missing))
+        results = merge_retried(codes, results, dict(zip(missing, retried)))
+    return collect_functions(codes, names, results)
+
+def save_assembled(code: str, usage, repair_usage, save_path: str):
+    save_code_to_file(code, save_path)
+    return f"```python\n{code}\n```", add_usage(usage, repair_usage) if repair_usage else usage
+
+def regenerate_modules(code: str, codes, layout: str, structure_json: str, save_path: str, material_list: str, plan: str = ""):
+    """
+    Regenerate only the named modules' functions of a script assembled in CODE_MODE=modules or template,
+    bypassing the response cache, and keep every other function as it is.
+    """
+    if code_mode not in ("modules", "template"):
+        raise ValueError(f"[ERROR] Modules can only be regenerated with CODE_MODE=modules or template (now {code_mode}).")
+    building = load_plan(plan, material_list)
+    modules = module_function_names(building)
+    unknown = [c for c in codes if c not in modules]
+    if unknown:
+        raise ValueError(f"[ERROR] No module {', '.join(unknown)} in this building (modules: {''.join(modules)})")
+    names = generated_function_names(building)
+    # In template mode the stair modules have no model-written part; reassembling rewrites their skeletons.
+    codes = [c for c in codes if c in names]
+    functions = split_module_functions(code, names)
+    missing = [c for c in names if c not in functions and c not in codes]
+    if code_mode != "template" and split_module_functions(code, furnish_function_names(building)):
+        raise ValueError("[ERROR] The saved code was generated with CODE_MODE=template; regenerate it in that mode.")
+    if missing:
+        raise ValueError(f"[ERROR] The saved code has no function for module {', '.join(missing)}; "
+                         f"it was not generated with CODE_MODE={code_mode}.")
+    regenerated, usage = generate_functions(layout, structure_json, building, codes, refresh=True)
+    functions.update(regenerated)
+    code, repair_usage = repair_code(build_script(building, structure_json, functions), material_list)
+    return save_assembled(code, usage, repair_usage, save_path)
+
+def generate_functions_and_save(layout: str, structure_json: str, save_path: str, material_list: str, plan: str):
+    building = load_plan(plan, material_list)
+    functions, usage = generate_functions(layout, structure_json, building, list(generated_function_names(building)))
+    code, repair_usage = repair_code(build_script(building, structure_json, functions), material_list)
+    return save_assembled(code, usage, repair_usage, save_path)
+
+async def agenerate_functions_and_save(layout: str, structure_json: str, save_path: str, material_list: str, plan: str):
+    building = load_plan(plan, material_list)
+    functions, usage = await agenerate_functions(layout, structure_json, building, list(generated_function_names(building)))
+    code, repair_usage = await arepair_code(build_script(building, structure_json, functions), material_list)
+    return save_assembled(code, usage, repair_usage, save_path)
+
+def uses_plan(plan: str) -> bool:
+    """Whether CODE_MODE builds the script from the plan; without one (unparseable layout) the whole script is requested."""
+    if code_mode in ("modules", "template") and not plan:
+        print(f"Warning: [Code Writing] No building plan for CODE_MODE={code_mode}, generating the script in one piece.")
+    return code_mode in ("modules", "template") and bool(plan)
+
+def generate_code_and_save(layout: str, structure_json: str, save_path: str, material_list: str, plan: str = ""):
+    if uses_plan(plan):
+        return generate_functions_and_save(layout, structure_json, save_path, material_list, plan)
+    if stream_code:
+        writer = StreamingCodeWriter(save_path)
+        try:
+            content, usage = stream_cached(llm, code_prompt(layout, structure_json), writer.feed)
+        finally:
+            writer.close()
+    else:
+        content, usage = invoke_cached(llm, code_prompt(layout, structure_json))
+    code, repair_usage = repair_code(extract_code_block(content), material_list)
+    return finish_code(content, code, usage, repair_usage, save_path)
+
+async def agenerate_code_and_save(layout: str, structure_json: str, save_path: str, material_list: str, plan: str = ""):
+    if uses_plan(plan):
+        return await agenerate_functions_and_save(layout, structure_json, save_path, material_list, plan)
+    if stream_code:
+        writer = StreamingCodeWriter(save_path)
+        try:
+            content, usage = await astream_cached(llm, code_prompt(layout, structure_json), writer.feed)
+        finally:
+            writer.close()
+    else:
+        content, usage = await ainvoke_cached(llm, code_prompt(layout, structure_json))
+    code, repair_usage = await arepair_code(extract_code_block(content), material_list)
+    return finish_code(content, code, usage, repair_usage, save_path)
\ No newline at end of file
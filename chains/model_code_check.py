@@ -0,0 +1,35 @@
+# chains/model_code_check.py
+import asyncio
+import json
+import os
+from utils.sandbox import run_generated_code, summarize_report
+from utils.layout_grid import parse_layout
+
+# CODE_CHECK=0 skips running the generated script in the sandbox.
+code_check = os.getenv("CODE_CHECK", "1") == "1"
+
+# Pipeline context keys passed to the generate function, in argument order.
+STAGE_INPUTS = ("code", "layout", "code_save_path")
+
+
+def grid_size(layout: str):
+    """(floors, rows, cols) of the layout grid, or None if the layout is not a clean grid."""
+    floors = parse_layout(layout)
+    return (len(floors), len(floors[0]), len(floors[0][0])) if floors else None
+
+
+def check_generated_code(code: str, layout: str, save_path: str):
+    """
+    Local stage: run the saved script in a subprocess against a recording editor and return the JSON report
+    (blocks placed, time per build_* function, exceptions, writes outside the layout; a layout that is not
+    a grid skips that bounds check).
+    """
+    if not code_check:
+        return json.dumps({"status": "skipped"}), {}
+    report = run_generated_code(save_path, grid_size(layout))
+    print(summarize_report(report))
+    return json.dumps(report, indent=2), {}
+
+
+async def acheck_generated_code(code: str, layout: str, save_path: str):
+    return await asyncio.to_thread(check_generated_code, code, layout, save_path)
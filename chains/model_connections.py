@@ -1,27 +1,61 @@
 # chains/model5_connections.py
-import os
+import re
 from dotenv import load_dotenv
 from langchain.prompts import ChatPromptTemplate
-from langchain_google_genai import ChatGoogleGenerativeAI
+from utils.llm_pool import get_llm
+from utils.model_routing import stage_model, invoke_checked, ainvoke_checked
 from utils.load_functions import load_text_file
+from utils.plan import plan_from_layout
 
 load_dotenv()
-model_name = os.getenv("MODEL_NAME")
+model_name = stage_model("connections")
 prompt_path = "prompts/connections.txt"
 prompt_text = load_text_file(prompt_path)
 prompt = ChatPromptTemplate.from_template(prompt_text)
 
-llm_strict = ChatGoogleGenerativeAI(model=model_name, temperature=0.0)
-chain = prompt | llm_strict
+llm_strict = get_llm(model_name, 0.0)
+
+# Pipeline context keys passed to the generate function, in argument order.
+STAGE_INPUTS = ("layout",)
+
+def solve_connections(plan) -> str:
+    """
+    Work out the N/S/E/W neighbours and the top-floor modules of every floor locally,
+    in the same text format prompts/connections.txt asks the model for.
+    """
+    lines = []
+    for floor in range(plan.grid.floors):
+        records = plan.floor_modules(floor)
+        if not records:
+            continue
+
+        lines.append(f"{floor + 1}F")
+        for record in records:
+            if record.links:
+                lines.append(f"{record.code}: " + ", ".join(f"{direction} to {other}" for direction, other in record.links))
+        lines.append("top-floor modules: " + ", ".join(record.code for record in records if record.top_floor))
+    return "\n".join(lines)
+
+
+def valid_connections(content: str) -> bool:
+    """At least one "A: north to B" line, the format apply_connections reads."""
+    return re.search(r"^\W*\S+\s*:.*\b(north|south|east|west)\s+to\s+\S", content, re.MULTILINE) is not None
+
 
 def generate_connections(layout: str):
-    response = chain.invoke({"layout": layout})
+    plan = plan_from_layout(layout)
+    if plan:
+        return solve_connections(plan), {}
+
+    # The layout could not be parsed as a grid, let the model reason about it instead.
+    print("Warning: layout could not be parsed, falling back to the model for connections.")
+    return invoke_checked(llm_strict, prompt.format_messages(layout=layout), valid_connections, "Connection Logic")
+
 
-    content = response.content if hasattr(response, "content") else str(response)
+async def agenerate_connections(layout: str):
+    plan = plan_from_layout(layout)
+    if plan:
+        return solve_connections(plan), {}
 
-    usage = {}
-    if hasattr(response, "usage_metadata") and response.usage_metadata:
-        usage = response.usage_metadata
-    elif hasattr(response, "response_metadata"):
-        usage = response.response_metadata.get("usage_metadata", {})
-    return content, usage
\ No newline at end of file
+    print("Warning: layout could not be parsed, falling back to the model for connections.")
+    return await ainvoke_checked(llm_strict, prompt.format_messages(layout=layout), valid_connections, "Connection Logic")
\ No newline at end of file
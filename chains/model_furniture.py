@@ -1,30 +1,32 @@
 # chains/model3_furniture.py
-import os
 from dotenv import load_dotenv
 from langchain.prompts import ChatPromptTemplate
-from langchain_google_genai import ChatGoogleGenerativeAI
+from utils.llm_pool import get_llm
+from utils.model_routing import stage_model
 from utils.load_functions import load_text_file
+from utils.llm_cache import invoke_cached, ainvoke_cached
 
 load_dotenv()
-model_name = os.getenv("MODEL_NAME")
+model_name = stage_model("furniture")
 prompt_path = "prompts/furniture.txt"
 prompt_text = load_text_file(prompt_path)
 prompt = ChatPromptTemplate.from_template(prompt_text)
 
-llm_creative = ChatGoogleGenerativeAI(model=model_name, temperature=0.9)
-chain = prompt | llm_creative
+llm_creative = get_llm(model_name, 0.9)
 
-def generate_furniture(style: str, modules: str, material_list: str):
+# Pipeline context keys passed to the generate function, in argument order.
+STAGE_INPUTS = ("style", "modules", "materials")
+
+def furniture_prompt(style: str, modules: str, material_list: str):
     inputs = {
         "style_description": style,
         "module_names": modules,
         "material_list": material_list
     }
-    response = chain.invoke(inputs)
-    content = response.content if hasattr(response, "content") else str(response)
-    usage = {}
-    if hasattr(response, "usage_metadata") and response.usage_metadata:
-        usage = response.usage_metadata
-    elif hasattr(response, "response_metadata"):
-        usage = response.response_metadata.get("usage_metadata", {})
-    return content, usage
\ No newline at end of file
+    return prompt.format_messages(**inputs)
+
+def generate_furniture(style: str, modules: str, material_list: str):
+    return invoke_cached(llm_creative, furniture_prompt(style, modules, material_list))
+
+async def agenerate_furniture(style: str, modules: str, material_list: str):
+    return await ainvoke_cached(llm_creative, furniture_prompt(style, modules, material_list))
\ No newline at end of file
@@ -1,29 +1,106 @@
 # chains/model4_layout.py
+import asyncio
 import os
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
 from langchain.prompts import ChatPromptTemplate
-from langchain_google_genai import ChatGoogleGenerativeAI
+from utils.llm_pool import get_llm
+from utils.model_routing import stage_model, invoke_checked, ainvoke_checked, escalate
+from utils.layout_grid import parse_layout, is_module
+from utils.layout_validator import validate_layout
 from utils.load_functions import load_text_file
+from utils.llm_cache import invoke_cached, ainvoke_cached, add_usage
+from utils.tracing import PARSE, span, run_in_context
 
 load_dotenv()
-model_name = os.getenv("MODEL_NAME")
+model_name = stage_model("layout")
 prompt_path = "prompts/layout.txt"
 prompt_text = load_text_file(prompt_path)
 prompt = ChatPromptTemplate.from_template(prompt_text)
+# The layout prompt followed by the rejected layout and its violations.
+repair_prompt = ChatPromptTemplate.from_template(prompt_text + "\n\n" + load_text_file("prompts/layout_repair.txt"))
 
-llm_strict = ChatGoogleGenerativeAI(model=model_name, temperature=0.0)
-chain = prompt | llm_strict
+# LAYOUT_CANDIDATES=N requests N layouts at once (the first at temperature 0.0, the others at
+# LAYOUT_CANDIDATE_TEMPERATURE) and keeps the one breaking the fewest rules of prompts/layout.txt.
+layout_candidates = max(1, int(os.getenv("LAYOUT_CANDIDATES", "1")))
+candidate_temperature = float(os.getenv("LAYOUT_CANDIDATE_TEMPERATURE", "0.7"))
+# Times a layout breaking the rules is sent back with its violations before the pipeline moves on (0 = never).
+layout_retries = int(os.getenv("LAYOUT_RETRIES", "1"))
 
-def generate_layout(style: str, modules: str):
+llm_strict = get_llm(model_name, 0.0)
+llm_varied = get_llm(model_name, candidate_temperature)
+
+# Pipeline context keys passed to the generate function, in argument order.
+STAGE_INPUTS = ("style", "modules")
+
+def layout_prompt(style: str, modules: str, feedback=None):
+    """The layout prompt, or with feedback=(rejected layout, violations) the prompt asking to fix it."""
     inputs = {
         "style_description": style,
         "module_names": modules,
     }
-    response = chain.invoke(inputs)
-    content = response.content if hasattr(response, "content") else str(response)
+    if feedback:
+        layout, violations = feedback
+        return repair_prompt.format_messages(**inputs, layout=layout, violations="\n".join(f"- {violation}" for violation in violations))
+    return prompt.format_messages(**inputs)
+
+def valid_layout(content: str) -> bool:
+    """The layout parses as a rectangular grid with at least one module."""
+    floors = parse_layout(content)
+    return floors is not None and any(is_module(cell) for floor in floors for row in floor for cell in row)
+
+def check_layout(content: str, style: str, modules: str):
+    """Stage check run after Layout Gen: every rule violation of the layout, with its position."""
+    with span("Validate layout", PARSE) as check:
+        violations = validate_layout(content, modules)
+        check.attrs["violations"] = len(violations)
+    return [str(violation) for violation in violations]
+
+def best_layout(results, modules: str):
+    """
+    (content, usage) of the candidate with the fewest violations (the earlier one on a tie),
+    with the usage of every candidate.
+    """
+    with span("Score layouts", PARSE, candidates=len(results)) as scoring:
+        scored = [(len(validate_layout(content, modules)), index) for index, (content, _) in enumerate(results)]
+        violations, index = min(scored)
+        scoring.attrs.update(chosen=index, violations=violations)
     usage = {}
-    if hasattr(response, "usage_metadata") and response.usage_metadata:
-        usage = response.usage_metadata
-    elif hasattr(response, "response_metadata"):
-        usage = response.response_metadata.get("usage_metadata", {})
+    for _, candidate_usage in results:
+        usage = add_usage(usage, candidate_usage)
+    if len(results) > 1:
+        print(f"[Layout Gen] Kept candidate {index + 1} of {len(results)} "
+              f"({violations} rule violations; others: {', '.join(str(v) for v, i in scored if i != index)})")
+    return results[index][0], usage
+
+def candidate_llm(index: int):
+    return llm_strict if index == 0 else llm_varied
+
+def generate_layout(style: str, modules: str, feedback=None):
+    if layout_candidates == 1 or feedback:
+        return invoke_checked(llm_strict, layout_prompt(style, modules, feedback), valid_layout, "Layout Gen")
+    layout_input = layout_prompt(style, modules)
+    with ThreadPoolExecutor(max_workers=layout_candidates) as pool:
+        futures = [run_in_context(pool, invoke_cached, candidate_llm(index), layout_input, None, False, index)
+                   for index in range(layout_candidates)]
+        content, usage = best_layout([future.result() for future in futures], modules)
+    if not valid_layout(content):
+        stronger = escalate(llm_strict, "Layout Gen")
+        if stronger is not None:
+            content, extra = invoke_cached(stronger, layout_input)
+            usage = add_usage(usage, extra)
+    return content, usage
+
+async def agenerate_layout(style: str, modules: str, feedback=None):
+    if layout_candidates == 1 or feedback:
+        return await ainvoke_checked(llm_strict, layout_prompt(style, modules, feedback), valid_layout, "Layout Gen")
+    layout_input = layout_prompt(style, modules)
+    results = await asyncio.gather(*(ainvoke_cached(candidate_llm(index), layout_input, variant=index)
+                                     for index in range(layout_candidates)))
+    content, usage = best_layout(results, modules)
+    if not valid_layout(content):
+        stronger = escalate(llm_strict, "Layout Gen")
+        if stronger is not None:
+            content, extra = await ainvoke_cached(stronger, layout_input)
+            usage = add_usage(usage, extra)
     return content, usage
\ No newline at end of file
@@ -0,0 +1,30 @@
+# chains/model_materials.py
+from utils.material_index import select_materials
+
+# Pipeline context keys passed to the generate function, in argument order.
+STAGE_INPUTS = ("user_input", "material_list")
+STYLE_STAGE_INPUTS = ("style", "material_list")
+
+
+def select_request_materials(user_input: str, material_list: str):
+    """
+    Local stage: the materials offered to the style prompt, picked from the user's description.
+    """
+    selected = select_materials(user_input, material_list.split(","))
+    return ",".join(selected), {}
+
+
+def select_style_materials(style: str, material_list: str):
+    """
+    Local stage: the materials offered to the furniture and JSON prompts, picked from the style description.
+    """
+    selected = select_materials(style, material_list.split(","))
+    return ",".join(selected), {}
+
+
+async def aselect_request_materials(user_input: str, material_list: str):
+    return select_request_materials(user_input, material_list)
+
+
+async def aselect_style_materials(style: str, material_list: str):
+    return select_style_materials(style, material_list)
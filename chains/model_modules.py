@@ -1,25 +1,31 @@
 # chains/model2_modules.py
-import os
 from dotenv import load_dotenv
 from langchain.prompts import ChatPromptTemplate
-from langchain_google_genai import ChatGoogleGenerativeAI
+from utils.llm_pool import get_llm
+import re
+from utils.model_routing import stage_model, invoke_checked, ainvoke_checked
 from utils.load_functions import load_text_file
 
 load_dotenv()
-model_name = os.getenv("MODEL_NAME")
+model_name = stage_model("modules")
 prompt_path = "prompts/modules.txt"
 prompt_text = load_text_file(prompt_path)
 prompt = ChatPromptTemplate.from_template(prompt_text)
 
-llm_creative = ChatGoogleGenerativeAI(model=model_name, temperature=0.9)
-chain = prompt | llm_creative
+llm_creative = get_llm(model_name, 0.9)
+
+# Pipeline context keys passed to the generate function, in argument order.
+STAGE_INPUTS = ("style",)
+
+def valid_module_names(content: str) -> bool:
+    """At least one lettered module ("A = Name") and no letter used twice."""
+    codes = re.findall(r"^\W*([A-Z])\s*=\s*\w", content, re.MULTILINE)
+    return bool(codes) and len(codes) == len(set(codes))
 
 def generate_module_names(style_description: str):
-    response = chain.invoke({"style_description": style_description})
-    content = response.content if hasattr(response, "content") else str(response)
-    usage = {}
-    if hasattr(response, "usage_metadata") and response.usage_metadata:
-        usage = response.usage_metadata
-    elif hasattr(response, "response_metadata"):
-        usage = response.response_metadata.get("usage_metadata", {})
-    return content, usage
\ No newline at end of file
+    return invoke_checked(llm_creative, prompt.format_messages(style_description=style_description),
+                          valid_module_names, "Module Definition")
+
+async def agenerate_module_names(style_description: str):
+    return await ainvoke_checked(llm_creative, prompt.format_messages(style_description=style_description),
+                                 valid_module_names, "Module Definition")
\ No newline at end of file
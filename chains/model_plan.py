@@ -0,0 +1,48 @@
+# chains/model_plan.py
+import json
+from chains.model_structure_json import extract_json_block
+from utils.tracing import PARSE, span
+from utils.plan import MaterialTable, plan_from_layout, apply_connections, apply_structure_json
+
+# Pipeline context keys passed to the generate function, in argument order.
+STAGE_INPUTS = ("layout", "connections", "structure_json", "material_list")
+
+# The tables of the material lists, built once and only read; every plan interns into its own copy.
+_material_tables = {}
+
+
+def get_material_table(material_list: str) -> MaterialTable:
+    """A fresh table of the listed IDs, for one plan to add the IDs the model invents to."""
+    if material_list not in _material_tables:
+        _material_tables[material_list] = MaterialTable.from_ids(material_list.split(","))
+    return _material_tables[material_list].copy()
+
+
+def parse_plan(layout: str, connections: str, structure_json: str, material_list: str):
+    """
+    Local stage: parse layout, connections and structure JSON once into a BuildingPlan and return
+    its compact form, so later local stages work on typed records instead of re-parsing prose.
+    A layout that is not a clean grid gives an empty plan; the stages reading it then do without.
+    """
+    with span("Parse layout", PARSE) as parse:
+        plan = plan_from_layout(layout, get_material_table(material_list))
+        if plan is None:
+            print("Warning: layout could not be parsed into a grid, continuing without a building plan.")
+            parse.attrs["parsed"] = False
+            return "", {}
+    apply_connections(plan, connections)
+    with span("Parse structure JSON", PARSE) as parse:
+        try:
+            structure = json.loads(extract_json_block(structure_json))
+        except json.JSONDecodeError:
+            structure = None
+        if isinstance(structure, dict):
+            apply_structure_json(plan, structure)
+        else:
+            print("Warning: structure JSON could not be parsed, the building plan has no materials.")
+            parse.attrs["parsed"] = False
+    return plan.to_compact(), {}
+
+
+async def aparse_plan(layout: str, connections: str, structure_json: str, material_list: str):
+    return parse_plan(layout, connections, structure_json, material_list)
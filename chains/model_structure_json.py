@@ -1,36 +1,86 @@
 # chains/model6_structure_json.py
-import os
+import re
+import json
 from dotenv import load_dotenv
 from langchain.prompts import ChatPromptTemplate
-from langchain_google_genai import ChatGoogleGenerativeAI
+from utils.llm_pool import get_llm
+from utils.model_routing import stage_model, invoke_checked, ainvoke_checked
 from utils.load_functions import load_text_file, load_json_file
+from utils.tracing import PARSE, span
+from utils.material_index import BlockIdIndex, correct_structure_materials
 
 load_dotenv()
-model_name = os.getenv("MODEL_NAME")
+model_name = stage_model("structure_json")
 structure_example_path = "examples/structure_example.json"
 structure_example = load_json_file(structure_example_path)
 prompt_path = "prompts/structure_json.txt"
 prompt_text = load_text_file(prompt_path)
 prompt = ChatPromptTemplate.from_template(prompt_text)
 
-llm_strict = ChatGoogleGenerativeAI(model=model_name, temperature=0.0)
-chain = prompt | llm_strict
+llm_strict = get_llm(model_name, 0.0)
 
-def generate_structure_json(style, modules, layout, connections, furniture, material_list):
+# Pipeline context keys passed to the generate function, in argument order.
+STAGE_INPUTS = ("style", "modules", "layout", "connections", "furniture", "material_list")
+
+_block_indexes = {}
+
+def structure_json_prompt(style, modules, layout, connections, furniture):
     inputs = {
         "style_description": style,
         "module_names": modules,
         "layout": layout,
         "connections": connections,
         "furniture": furniture,
-        "structure_example": structure_example,
-        "material_names": material_list
+        "structure_example": structure_example
     }
-    response = chain.invoke(inputs)
-    content = response.content if hasattr(response, "content") else str(response)
-    usage = {}
-    if hasattr(response, "usage_metadata") and response.usage_metadata:
-        usage = response.usage_metadata
-    elif hasattr(response, "response_metadata"):
-        usage = response.response_metadata.get("usage_metadata", {})
-    return content, usage
\ No newline at end of file
+    return prompt.format_messages(**inputs)
+
+def extract_json_block(response: str) -> str:
+    match = re.search(r"```(?:json)?\n(.*?)```", response, re.DOTALL)
+    if match:
+        return match.group(1).strip()
+    else:
+        return response.strip()
+
+def get_block_index(material_list: str) -> BlockIdIndex:
+    if material_list not in _block_indexes:
+        _block_indexes[material_list] = BlockIdIndex(material_list.split(","))
+    return _block_indexes[material_list]
+
+def validate_structure_materials(content: str, material_list: str) -> str:
+    """
+    Local pass replacing the prompt's old "compare with AVAILABLE MATERIALS" step: every material field
+    is split into valid block IDs and stray IDs in the other fields are corrected to the nearest valid one.
+    """
+    with span("Validate structure JSON", PARSE) as check:
+        try:
+            data = json.loads(extract_json_block(content))
+        except json.JSONDecodeError:
+            print("Warning: structure JSON could not be parsed, block IDs were not validated.")
+            check.attrs["parsed"] = False
+            return content
+
+        corrections = {}
+        data = correct_structure_materials(data, get_block_index(material_list), corrections)
+        for original, corrected in corrections.items():
+            print(f"[JSON Construction] '{original}' corrected to '{corrected}'")
+        check.attrs["corrections"] = len(corrections)
+        return json.dumps(data, ensure_ascii=False, indent=2)
+
+def valid_structure_json(content: str) -> bool:
+    """The JSON parses and has a non-empty "modules" list."""
+    try:
+        data = json.loads(extract_json_block(content))
+    except json.JSONDecodeError:
+        return False
+    return isinstance(data, dict) and isinstance(data.get("modules"), list) and bool(data["modules"])
+
+def generate_structure_json(style, modules, layout, connections, furniture, material_list):
+    content, usage = invoke_checked(llm_strict, structure_json_prompt(style, modules, layout, connections, furniture),
+                                    valid_structure_json, "JSON Construction")
+    return validate_structure_materials(content, material_list), usage
+
+async def agenerate_structure_json(style, modules, layout, connections, furniture, material_list):
+    content, usage = await ainvoke_checked(llm_strict, structure_json_prompt(style, modules, layout, connections, furniture),
+                                           valid_structure_json, "JSON Construction")
+    return validate_structure_materials(content, material_list), usage
\ No newline at end of file
@@ -1,22 +1,29 @@
 # chains/model1_style.py
-import os
 import base64
 import mimetypes
 from dotenv import load_dotenv
 from langchain.prompts import ChatPromptTemplate
-from langchain_google_genai import ChatGoogleGenerativeAI
 from langchain.schema import HumanMessage
+from utils.llm_pool import get_llm
+from utils.model_routing import stage_model
 from utils.load_functions import load_text_file
+from utils.llm_cache import invoke_cached, ainvoke_cached
 
 load_dotenv()
-model_name = os.getenv("MODEL_NAME")
+model_name = stage_model("style")
 prompt_path = "prompts/style.txt"
 prompt_text = load_text_file(prompt_path)
 prompt = ChatPromptTemplate.from_template(prompt_text)
 
-llm_creative = ChatGoogleGenerativeAI(model=model_name, temperature=0.9)
+llm_creative = get_llm(model_name, 0.9)
 
-def get_style_description(user_input_text: str, material_list: str, image_path: str = None):
+# Pipeline context keys passed to the generate function, in argument order.
+STAGE_INPUTS = ("user_input", "request_materials", "image_path")
+
+def style_prompt(user_input_text: str, material_list: str, image_path: str = None):
+    """
+    The text prompt on its own, or a single message carrying the text and the base64 image.
+    """
     inputs = {
         "user_input": user_input_text,
         "material_names": material_list
@@ -24,7 +31,7 @@ def get_style_description(user_input_text: str, material_list: str, image_path:
     text_prompt = prompt.format(**inputs)
 
     if not image_path:
-        response = llm_creative.invoke(text_prompt)
+        return text_prompt
     else:
         mime_type, _ = mimetypes.guess_type(image_path)
         if mime_type is None:
@@ -43,13 +50,10 @@ def get_style_description(user_input_text: str, material_list: str, image_path:
             }
         ])
 
-        response = llm_creative.invoke([message])
+        return [message]
 
-    content = response.content if hasattr(response, "content") else str(response)
+def get_style_description(user_input_text: str, material_list: str, image_path: str = None):
+    return invoke_cached(llm_creative, style_prompt(user_input_text, material_list, image_path), image_path)
 
-    usage = {}
-    if hasattr(response, "usage_metadata") and response.usage_metadata:
-        usage = response.usage_metadata
-    elif hasattr(response, "response_metadata"):
-        usage = response.response_metadata.get("usage_metadata", {})
-    return content, usage
\ No newline at end of file
+async def aget_style_description(user_input_text: str, material_list: str, image_path: str = None):
+    return await ainvoke_cached(llm_creative, style_prompt(user_input_text, material_list, image_path), image_path)
\ No newline at end of file
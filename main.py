@@ -1,30 +1,28 @@
 import time
 import os
-from dotenv import load_dotenv
+import argparse
+import asyncio
+import json
+import re
+import threading
 from concurrent.futures import ThreadPoolExecutor
-from chains.model_style import get_style_description
-from chains.model_modules import generate_module_names
-from chains.model_furniture import generate_furniture
-from chains.model_layout import generate_layout
-from chains.model_connections import generate_connections
-from chains.model_structure_json import generate_structure_json
-from chains.model_code import generate_code_and_save
+from dotenv import load_dotenv
+from chains import model_style, model_modules, model_furniture, model_layout
+from chains import model_connections, model_structure_json, model_code, model_materials, model_plan
+from chains import model_code_check
 from utils.load_functions import load_material_map
 from utils.save_log import save_raw_response
+from utils.pipeline import Stage, run_stages, arun_stages, run_task_with_timing
+from utils.tracing import BATCH, BUILDING, STAGE, LLM, span, children, descendants, run_in_context
+from utils.tracing import save_trace, discard_trace
+from utils.pricing import describe_prices
+from utils.budget import BATCH_BUDGET, BUILDING_BUDGET, budget_scope
+from utils.checkpoint import get_run_dir, save_run_input, load_run_input
+from utils.checkpoint import save_stage_checkpoint, load_stage_checkpoints
 
 load_dotenv()
 MODEL_NAME = os.getenv("MODEL_NAME", "gemini-2.5-pro")
 
-INPUT_PRICE_PER_1M = 1.25
-OUTPUT_PRICE_PER_1M = 10.00
-
-step_logs = []
-
-def calculate_cost(input_tokens, output_tokens):
-    input_cost = (input_tokens / 1_000_000) * INPUT_PRICE_PER_1M
-    output_cost = (output_tokens / 1_000_000) * OUTPUT_PRICE_PER_1M
-    return input_cost + output_cost
-
 def log_step(step_name, duration, usage_data):
     if not usage_data:
         usage_data = {'input_tokens': 0, 'output_tokens': 0}
@@ -32,45 +30,83 @@ def log_step(step_name, duration, usage_data):
     input_tokens = usage_data.get('input_tokens', 0)
     output_tokens = usage_data.get('output_tokens', 0)
 
-    cost = calculate_cost(input_tokens, output_tokens)
-
-    log_entry = {
-        "name": step_name,
-        "duration": duration,
-        "input_tokens": input_tokens,
-        "output_tokens": output_tokens,
-        "total_tokens": input_tokens + output_tokens,
-        "cost": cost
-    }
-    step_logs.append(log_entry)
+    # Priced per request by model and prompt-size tier in utils/llm_cache.py (utils/pricing.py).
+    cost = usage_data.get('cost', 0)
 
     print(
         f"[{step_name}] Time: {duration:.2f}s | Real Tokens: In {input_tokens} / Out {output_tokens} | Cost: ${cost:.5f}")
-    return log_entry
-
-def run_task_with_timing(func, *args):
-    start = time.perf_counter()
-    try:
-        content, usage = func(*args)
-    except ValueError:
-        content = func(*args)
-        usage = {}
-        print(f"Warning: {func.__name__} did not return usage data.")
-
-    end = time.perf_counter()
-    duration = end - start
 
-    return (content, usage), duration
-
-
-if __name__ == "__main__":
-    materials_map = load_material_map("materials/materials.txt")
-    material_list = ",".join(materials_map.values())
-
-    timestamp = time.strftime("%Y%m%d_%H%M%S")
-    log_save_path = f"generated/log_{timestamp}.txt"
-    code_save_path = f"generated/code_{timestamp}.py"
 
+def stage_steps(building):
+    """
+    One record per stage the building ran, read from its trace: when it started (seconds into the building),
+    how long it took, its tokens (cached input and thinking tokens are also counted in input and output) and cost,
+    and its LLM calls with their total queue time and retries.
+    """
+    steps = []
+    for stage in children(building, STAGE):
+        calls = [s for s in descendants(stage) if s.category == LLM]
+        input_tokens = stage.attrs.get("input_tokens", 0)
+        output_tokens = stage.attrs.get("output_tokens", 0)
+        steps.append({
+            "name": stage.name,
+            "start": (stage.start - building.start) / 1e9,
+            "duration": stage.duration,
+            "input_tokens": input_tokens,
+            "output_tokens": output_tokens,
+            "total_tokens": input_tokens + output_tokens,
+            "cached_tokens": stage.attrs.get("cached_tokens", 0),
+            "reasoning_tokens": stage.attrs.get("reasoning_tokens", 0),
+            "cost": stage.attrs.get("cost", 0),
+            "llm_calls": len(calls),
+            "queue_time": sum(call.attrs.get("queue_time", 0) for call in calls),
+            "retries": stage.attrs.get("retries", 0),
+            "models": sorted({call.attrs.get("model", "").removeprefix("models/") for call in calls}),
+        })
+    return steps
+
+# The generation steps as a dependency graph: each stage starts as soon as the
+# context keys it reads are available, so e.g. Connections overlaps with Furniture.
+STAGES = [
+    Stage("Material Selection", model_materials.select_request_materials, model_materials.STAGE_INPUTS,
+          "request_materials", "\n\nRequest Materials:",
+          model_materials.aselect_request_materials),
+    Stage("Style Generation", model_style.get_style_description, model_style.STAGE_INPUTS,
+          "style", "\nBuilding Style:",
+          model_style.aget_style_description),
+    Stage("Style Materials", model_materials.select_style_materials, model_materials.STYLE_STAGE_INPUTS,
+          "materials", "\n\nStyle Materials:",
+          model_materials.aselect_style_materials),
+    Stage("Module Definition", model_modules.generate_module_names, model_modules.STAGE_INPUTS,
+          "modules", "\n\nModule Name:",
+          model_modules.agenerate_module_names),
+    Stage("Furniture Gen", model_furniture.generate_furniture, model_furniture.STAGE_INPUTS,
+          "furniture", "\n\nModule Furniture:",
+          model_furniture.agenerate_furniture),
+    # Layouts breaking the rules of prompts/layout.txt are sent back with their violations (utils/layout_validator.py)
+    # before the expensive JSON and code stages build on them.
+    Stage("Layout Gen", model_layout.generate_layout, model_layout.STAGE_INPUTS,
+          "layout", "\n\nModule Layout:",
+          model_layout.agenerate_layout, model_layout.check_layout, model_layout.layout_retries),
+    Stage("Connection Logic", model_connections.generate_connections, model_connections.STAGE_INPUTS,
+          "connections", "\n\nModule Connections:",
+          model_connections.agenerate_connections),
+    Stage("JSON Construction", model_structure_json.generate_structure_json, model_structure_json.STAGE_INPUTS,
+          "structure_json", "\n\nStructure Layout(JSON):",
+          model_structure_json.agenerate_structure_json),
+    Stage("Building Plan", model_plan.parse_plan, model_plan.STAGE_INPUTS,
+          "plan", "\n\nBuilding Plan:",
+          model_plan.aparse_plan),
+    Stage("Code Writing", model_code.generate_code_and_save, model_code.STAGE_INPUTS,
+          "code", "\n\nCode Generation:",
+          model_code.agenerate_code_and_save),
+    Stage("Code Check", model_code_check.check_generated_code, model_code_check.STAGE_INPUTS,
+          "code_check", "\n\nCode Check:",
+          model_code_check.acheck_generated_code),
+]
+
+
+def read_user_request():
     user_input = input("Please enter a description of the building:\n> ").strip()
     if not user_input:
         user_input = None
@@ -89,98 +125,337 @@ if __name__ == "__main__":
 
     if image_path:
         print(f"Image set: {image_path}")
+    return user_input, image_path
 
-    input_log = f"Model: {MODEL_NAME}\nPrompt: {user_input}\nImage: {image_path}"
-    save_raw_response(input_log, log_save_path, "--- Input Settings ---")
-
-    print("\n" + "=" * 60)
-    print(f"   STARTING GENERATION (Real Token Tracking)   ")
-    print("=" * 60 + "\n")
-
-    total_start_time = time.perf_counter()
-
-    # --- Step 1: Style ---
-    (style, style_usage), dur = run_task_with_timing(get_style_description, user_input, material_list, image_path)
-    save_raw_response(style, log_save_path, "\nBuilding Style:")
-    log_step("Style Generation", dur, style_usage)
 
-    # --- Step 2: Modules ---
-    (modules, modules_usage), dur = run_task_with_timing(generate_module_names, style)
-    save_raw_response(modules, log_save_path, "\n\nModule Name:")
-    log_step("Module Definition", dur, modules_usage)
 
-    # --- Step 3 & 4: Furniture & Layout ---
-    print("\n>>> Starting Parallel Execution (Furniture & Layout)...")
-    parallel_start = time.perf_counter()
+def start_run(user_input, image_path, run_id=None):
+    """
+    Create generated/runs/<run_id>/input.json and the log file for a new building; returns the run id.
+    """
+    run_id = run_id or time.strftime("%Y%m%d_%H%M%S")
+    log_save_path = f"generated/log_{run_id}.txt"
+    code_save_path = f"generated/code_{run_id}.py"
+    save_run_input(get_run_dir(run_id), {
+        "model": MODEL_NAME,
+        "prompt": user_input,
+        "image": image_path,
+        "log_path": log_save_path,
+        "code_path": code_save_path,
+    })
 
-    with ThreadPoolExecutor(max_workers=2) as executor:
-        future_furn = executor.submit(run_task_with_timing, generate_furniture, style, modules, material_list)
-        future_layout = executor.submit(run_task_with_timing, generate_layout, style, modules)
+    input_log = f"Model: {MODEL_NAME}\nPrompt: {user_input}\nImage: {image_path}"
+    save_raw_response(input_log, log_save_path, "--- Input Settings ---")
+    return run_id
+
+
+def prepare_building(run_id, material_list):
+    """
+    Load a run's inputs and finished checkpoints; returns (run_input, context, on_stage_complete).
+    """
+    run_dir = get_run_dir(run_id)
+    run_input = load_run_input(run_dir)
+    log_save_path, code_save_path = run_input["log_path"], run_input["code_path"]
+
+    context = {
+        "user_input": run_input["prompt"],
+        "material_list": material_list,
+        "image_path": run_input["image"],
+        "code_save_path": code_save_path,
+    }
 
-        (furniture, furn_usage), dur_furn = future_furn.result()
-        (layout, layout_usage), dur_layout = future_layout.result()
+    # Stages finished by an earlier attempt of this run are restored instead of regenerated.
+    for output, checkpoint in load_stage_checkpoints(run_dir, STAGES).items():
+        context[output] = checkpoint["content"]
+        print(f"[{checkpoint['stage']}] Restored from checkpoint")
+
+    def on_stage_complete(stage, content, usage, duration):
+        save_stage_checkpoint(run_dir, stage, content, usage, duration)
+        save_raw_response(content, log_save_path, stage.note)
+        log_step(stage.name, duration, usage)
+
+    return run_input, context, on_stage_complete
+
+
+def building_result(run_id, run_input, building, context):
+    """
+    Summary of a finished building span. A building traced on its own (not inside a batch) also gets
+    its trace files written here.
+    """
+    steps = stage_steps(building)
+    trace_path = None
+    if building.parent_id is None:
+        trace_path = save_trace(building, run_id)
+        discard_trace(building)
+    return {
+        "run_id": run_id,
+        "run_dir": get_run_dir(run_id),
+        "log_path": run_input["log_path"],
+        "code_path": run_input["code_path"],
+        "trace_path": trace_path,
+        "duration": building.duration,
+        "input_tokens": sum(item['input_tokens'] for item in steps),
+        "output_tokens": sum(item['output_tokens'] for item in steps),
+        "cached_tokens": sum(item['cached_tokens'] for item in steps),
+        "reasoning_tokens": sum(item['reasoning_tokens'] for item in steps),
+        "cost": sum(item['cost'] for item in steps),
+        "steps": steps,
+        "code_check": json.loads(context["code_check"]) if "code_check" in context else None,
+    }
 
-    parallel_dur = time.perf_counter() - parallel_start
-    print(f">>> Parallel block finished in {parallel_dur:.2f}s\n")
 
-    save_raw_response(furniture, log_save_path, "\n\nModule Furniture:")
-    log_step("Furniture Gen", dur_furn, furn_usage)
+def generate_building(run_id, material_list):
+    """
+    Run (or resume) every stage of one building; returns a summary with paths, timings and per-step usage.
+    """
+    run_input, context, on_stage_complete = prepare_building(run_id, material_list)
+    with span(f"Building {run_id}", BUILDING, run_id=run_id) as building, budget_scope("building", BUILDING_BUDGET):
+        run_stages(STAGES, context, on_stage_complete)
+    return building_result(run_id, run_input, building, context)
+
+
+async def agenerate_building(run_id, material_list):
+    """
+    Same as generate_building, but every stage runs as a task on the event loop.
+    """
+    run_input, context, on_stage_complete = prepare_building(run_id, material_list)
+    with span(f"Building {run_id}", BUILDING, run_id=run_id) as building, budget_scope("building", BUILDING_BUDGET):
+        await arun_stages(STAGES, context, on_stage_complete)
+    return building_result(run_id, run_input, building, context)
+
+
+def regenerate_building_modules(run_id, codes, material_list):
+    """
+    Regenerate only the given module functions of a finished run (CODE_MODE=modules) and rerun the code check.
+    """
+    run_input, context, on_stage_complete = prepare_building(run_id, material_list)
+    if "code" not in context or "plan" not in context:
+        raise ValueError(f"[ERROR] Run {run_id} has no generated code to regenerate modules of; resume it first.")
+    if not context["plan"]:
+        raise ValueError(f"[ERROR] Run {run_id} has no building plan (its layout is not a grid), so its modules cannot be regenerated.")
+    with open(run_input["code_path"], "r", encoding="utf-8") as f:
+        code = f.read()
+
+    stage = next(stage for stage in STAGES if stage.output == "code")
+    print(f">>> Regenerating modules {', '.join(codes)}...")
+    building_span = span(f"Building {run_id}", BUILDING, run_id=run_id, regenerate=",".join(codes))
+    with building_span as building, budget_scope("building", BUILDING_BUDGET):
+        (content, usage), duration = run_task_with_timing(stage.name, model_code.regenerate_modules, code, codes,
+                                                          *(context[key] for key in stage.inputs))
+        on_stage_complete(stage, content, usage, duration)
+        context["code"] = content
+        context.pop("code_check", None)
+        run_stages(STAGES, context, on_stage_complete)
+    return building_result(run_id, run_input, building, context)
+
+
+def save_report(result, echo=True):
+    """
+    Append the FINAL PERFORMANCE REPORT of one building to its log file, printing it when echo is set.
+    """
+    step_logs = result["steps"]
+    report_lines = []
+    models = sorted({model for log in step_logs for model in log["models"]}) or [MODEL_NAME]
+    report_lines.append(f"\nModel Used: {', '.join(models)}")
+    for model in models:
+        report_lines.append(f"Price ({model}): {describe_prices(model)}")
+    report_lines.append("\n--- Detailed Breakdown ---")
 
-    save_raw_response(layout, log_save_path, "\n\nModule Layout:")
-    log_step("Layout Gen", dur_layout, layout_usage)
+    header = f"{'Step Name':<20} | {'Start(s)':<8} | {'Time(s)':<8} | {'Calls':<5} | {'In Tok':<8} | {'Out Tok':<8} | {'Cost($)':<10}"
+    report_lines.append(header)
+    report_lines.append("-" * 90)
 
-    # --- Step 5: Connections ---
-    (connections, conn_usage), dur = run_task_with_timing(generate_connections, layout)
-    save_raw_response(connections, log_save_path, "\n\nModule Connections:")
-    log_step("Connection Logic", dur, conn_usage)
+    for log in step_logs:
+        line = f"{log['name']:<20} | {log['start']:<8.2f} | {log['duration']:<8.2f} | {log['llm_calls']:<5} | {log['input_tokens']:<8} | {log['output_tokens']:<8} | {log['cost']:<10.5f}"
+        report_lines.append(line)
 
-    # --- Step 6: JSON ---
-    (structure_json, json_usage), dur = run_task_with_timing(generate_structure_json, style, modules, layout,
-                                                             connections, furniture, material_list)
-    save_raw_response(structure_json, log_save_path, "\n\nStructure Layout(JSON):")
-    log_step("JSON Construction", dur, json_usage)
+    report_lines.append("-" * 90)
 
-    # --- Step 7: Code ---
-    (code_gen, code_usage), dur = run_task_with_timing(generate_code_and_save, layout, structure_json, code_save_path)
-    save_raw_response(code_gen, log_save_path, "\n\nCode Generation:")
-    log_step("Code Writing", dur, code_usage)
+    summary = f"TOTAL                |          | {result['duration']:<8.2f} |       | {result['input_tokens']:<8} | {result['output_tokens']:<8} | ${result['cost']:.5f}"
+    report_lines.append(summary)
+    report_lines.append(f"Cached input tokens: {result['cached_tokens']} | Thinking tokens: {result['reasoning_tokens']}")
 
-    # --- Cost Info ---
-    total_elapsed = time.perf_counter() - total_start_time
-    total_cost = sum(item['cost'] for item in step_logs)
-    total_tokens_in = sum(item['input_tokens'] for item in step_logs)
-    total_tokens_out = sum(item['output_tokens'] for item in step_logs)
+    if echo:
+        print("\n" + "=" * 90)
+        print(f"                    FINAL PERFORMANCE REPORT ({MODEL_NAME})                    ")
+        print("=" * 90)
+        print("\n".join(report_lines[3:]))
+        if result.get("trace_path"):
+            print(f"Trace saved to: {result['trace_path']} (open in chrome://tracing or ui.perfetto.dev)")
 
-    print("\n" + "=" * 70)
-    print(f"          FINAL PERFORMANCE REPORT ({MODEL_NAME})          ")
-    print("=" * 70)
+    save_raw_response("\n".join(report_lines), result["log_path"], "")
 
-    report_lines = []
-    report_lines.append(f"\nModel Used: {MODEL_NAME}")
-    report_lines.append(f"Price: Input ${INPUT_PRICE_PER_1M}/1M | Output ${OUTPUT_PRICE_PER_1M}/1M")
-    report_lines.append("\n--- Detailed Breakdown ---")
 
-    header = f"{'Step Name':<20} | {'Time(s)':<8} | {'In Tok':<8} | {'Out Tok':<8} | {'Cost($)':<10}"
-    print(header)
-    print("-" * 70)
-    report_lines.append(header)
-    report_lines.append("-" * 70)
+def run_single(resume_run_id, material_list, use_async=False, regenerate=None):
+    if regenerate:
+        result = regenerate_building_modules(resume_run_id, regenerate, material_list)
+        save_report(result)
+        print(f"\nCode saved to: {result['code_path']}")
+        return
 
-    for log in step_logs:
-        line = f"{log['name']:<20} | {log['duration']:<8.2f} | {log['input_tokens']:<8} | {log['output_tokens']:<8} | {log['cost']:<10.5f}"
-        print(line)
-        report_lines.append(line)
+    if resume_run_id:
+        run_id = resume_run_id
+        print(f"Resuming run {run_id}")
+    else:
+        user_input, image_path = read_user_request()
+        run_id = start_run(user_input, image_path)
 
-    print("-" * 70)
-    report_lines.append("-" * 70)
+    print("\n" + "=" * 60)
+    print(f"   STARTING GENERATION (Real Token Tracking)   ")
+    print("=" * 60 + "\n")
 
-    summary = f"TOTAL               | {total_elapsed:<8.2f} | {total_tokens_in:<8} | {total_tokens_out:<8} | ${total_cost:.5f}"
-    print(summary)
-    report_lines.append(summary)
+    if use_async:
+        result = asyncio.run(agenerate_building(run_id, material_list))
+    else:
+        result = generate_building(run_id, material_list)
+    save_report(result)
+
+    print(f"\nLog saved to: {result['log_path']}")
+    print(f"Checkpoints saved to: {result['run_dir']} (resume with: python main.py --resume {run_id})")
+
+    print(f"Code saved to: {result['code_path']}")
+
+
+def read_batch_requests(batch_path):
+    """
+    Stream building requests from a JSONL file: {"prompt": ..., "image": optional path, "id": optional}.
+    """
+    with open(batch_path, "r", encoding="utf-8") as f:
+        for line_number, line in enumerate(f, start=1):
+            line = line.strip()
+            if not line:
+                continue
+            request = json.loads(line)
+            request_id = str(request.get("id") or line_number)
+            yield request_id, request.get("prompt") or request.get("description"), request.get("image")
+
+
+def load_finished_ids(output_path):
+    if not os.path.exists(output_path):
+        return set()
+    with open(output_path, "r", encoding="utf-8") as f:
+        records = [json.loads(line) for line in f if line.strip()]
+    return {record["id"] for record in records if record.get("status") == "ok"}
+
+
+def batch_run_id(batch_stamp, request_id):
+    return f"{batch_stamp}_{re.sub(r'[^A-Za-z0-9_-]', '_', request_id)}"
+
+
+def write_batch_record(output_path, record, write_lock):
+    with write_lock:
+        with open(output_path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+    print(f">>> [{record['id']}] {record['status']}"
+          + (f" in {record['duration']:.2f}s, ${record['cost']:.5f}" if record["status"] == "ok" else f": {record['error']}"))
+
+
+def finish_batch_trace(batch, batch_stamp):
+    """Write one trace for the whole batch, every building a process in it, to find the batch's critical path."""
+    trace_path = save_trace(batch, f"batch_{batch_stamp}")
+    discard_trace(batch)
+    if trace_path:
+        print(f"Batch trace saved to: {trace_path}")
+
+
+def run_batch(batch_path, output_path, workers, material_list):
+    """
+    Generate every request of batch_path with at most `workers` buildings in flight, appending one
+    JSONL record per building to output_path as soon as it finishes. Requests already recorded as ok are skipped.
+    """
+    batch_stamp = time.strftime("%Y%m%d_%H%M%S")
+    finished_ids = load_finished_ids(output_path)
+    write_lock = threading.Lock()
+    slots = threading.BoundedSemaphore(workers)
+
+    def build_one(request_id, user_input, image_path):
+        record = {"id": request_id, "prompt": user_input, "image": image_path}
+        try:
+            run_id = start_run(user_input, image_path, batch_run_id(batch_stamp, request_id))
+            result = generate_building(run_id, material_list)
+            save_report(result, echo=False)
+            record.update(status="ok", **result)
+        except Exception as e:
+            record.update(status="error", error=f"{type(e).__name__}: {e}")
+        finally:
+            slots.release()
+        write_batch_record(output_path, record, write_lock)
+
+    os.makedirs(os.path.dirname(output_path) or ".", exist_ok=True)
+    with span(f"Batch {batch_stamp}", BATCH, batch=batch_path, workers=workers) as batch, budget_scope("batch", BATCH_BUDGET):
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            for request_id, user_input, image_path in read_batch_requests(batch_path):
+                if request_id in finished_ids:
+                    print(f">>> [{request_id}] already done, skipped")
+                    continue
+                # Only read the next request once a worker is free, so huge files are streamed.
+                slots.acquire()
+                run_in_context(executor, build_one, request_id, user_input, image_path)
+    finish_batch_trace(batch, batch_stamp)
+
+
+async def arun_batch(batch_path, output_path, workers, material_list):
+    """
+    run_batch on a single event loop: up to `workers` buildings are in flight as tasks instead of threads.
+    """
+    batch_stamp = time.strftime("%Y%m%d_%H%M%S")
+    finished_ids = load_finished_ids(output_path)
+    write_lock = threading.Lock()
+    slots = asyncio.Semaphore(workers)
+
+    async def build_one(request_id, user_input, image_path):
+        record = {"id": request_id, "prompt": user_input, "image": image_path}
+        try:
+            run_id = start_run(user_input, image_path, batch_run_id(batch_stamp, request_id))
+            result = await agenerate_building(run_id, material_list)
+            save_report(result, echo=False)
+            record.update(status="ok", **result)
+        except Exception as e:
+            record.update(status="error", error=f"{type(e).__name__}: {e}")
+        finally:
+            slots.release()
+        write_batch_record(output_path, record, write_lock)
+
+    os.makedirs(os.path.dirname(output_path) or ".", exist_ok=True)
+    tasks = set()
+    with span(f"Batch {batch_stamp}", BATCH, batch=batch_path, workers=workers) as batch, budget_scope("batch", BATCH_BUDGET):
+        for request_id, user_input, image_path in read_batch_requests(batch_path):
+            if request_id in finished_ids:
+                print(f">>> [{request_id}] already done, skipped")
+                continue
+            await slots.acquire()
+            task = asyncio.create_task(build_one(request_id, user_input, image_path))
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
+        await asyncio.gather(*tasks)
+    finish_batch_trace(batch, batch_stamp)
 
-    save_raw_response("\n".join(report_lines), log_save_path, "")
 
-    print(f"\nLog saved to: {log_save_path}")
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate a Minecraft building with an LLM pipeline.")
+    parser.add_argument("--resume", metavar="RUN_ID",
+                        help="continue generated/runs/RUN_ID, skipping the stages that already finished")
+    parser.add_argument("--batch", metavar="JSONL",
+                        help="non-interactive mode: generate one building per line of this JSONL file")
+    parser.add_argument("--workers", type=int, default=4, help="buildings generated concurrently in batch mode")
+    parser.add_argument("--output", default="generated/batch_results.jsonl",
+                        help="JSONL file batch mode appends one result record per building to")
+    parser.add_argument("--async", dest="use_async", action="store_true",
+                        help="run the stages (and batch buildings) as asyncio tasks using the models' ainvoke")
+    parser.add_argument("--regenerate", metavar="CODE", nargs="+",
+                        help="with --resume: regenerate only these module functions (CODE_MODE=modules runs)")
+    args = parser.parse_args()
+    if args.regenerate and not args.resume:
+        parser.error("--regenerate needs --resume RUN_ID")
 
-    print(f"Code saved to: {code_save_path}")
+    materials_map = load_material_map("materials/materials.txt")
+    material_list = ",".join(materials_map.values())
 
+    if args.batch:
+        if args.use_async:
+            asyncio.run(arun_batch(args.batch, args.output, args.workers, material_list))
+        else:
+            run_batch(args.batch, args.output, args.workers, material_list)
+        print(f"\nBatch results saved to: {args.output}")
+    else:
+        run_single(args.resume, material_list, args.use_async, args.regenerate)
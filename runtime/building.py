@@ -0,0 +1,154 @@
+# runtime/building.py
+from gdpc import Block
+from runtime.export import make_editor
+
+# The utility functions every generated build script imports instead of carrying its own copy.
+# They draw through the shared editor below: blocks are collected in a NumPy voxel volume and sent to the
+# buffered gdpc Editor in bulk on editor.flushBuffer() (or written to a .schem/.nbt file when BUILD_EXPORT is set).
+editor = make_editor()
+
+
+def place_filled_room(x1, y1, z1, width, length, height, wall, floor, ceiling):
+    """Builds a hollow room with specified materials for walls, floor, and roof."""
+    if ceiling == "air":
+        ceiling = "glass"
+
+    x2, y2, z2 = x1 + width - 1, y1 + height - 1, z1 + length - 1
+
+    # Place floor and ceiling
+    editor.fill(x1, y1, z1, x2, y1, z2, Block(floor))
+    editor.fill(x1, y2, z1, x2, y2, z2, Block(ceiling))
+
+    # Place walls
+    editor.fill(x1, y1 + 1, z1, x2, y2 - 1, z1, Block(wall))
+    editor.fill(x1, y1 + 1, z2, x2, y2 - 1, z2, Block(wall))
+    editor.fill(x1, y1 + 1, z1, x1, y2 - 1, z2, Block(wall))
+    editor.fill(x2, y1 + 1, z1, x2, y2 - 1, z2, Block(wall))
+
+
+def place_wall_section(x1, y1, z1, width, height, material, direction, length=1):
+    """Replaces a section of a wall with a different material, ideal for windows."""
+    if width <= 0 or height <= 0 or length <= 0:
+        return
+    y2 = y1 + height - 1
+    if direction == 'north':
+        editor.fill(x1, y1, z1 - length + 1, x1 + width - 1, y2, z1, Block(material))
+    elif direction == 'south':
+        editor.fill(x1, y1, z1, x1 + width - 1, y2, z1 + length - 1, Block(material))
+    elif direction == 'west':
+        editor.fill(x1 - length + 1, y1, z1, x1, y2, z1 + width - 1, Block(material))
+    elif direction == 'east':
+        editor.fill(x1, y1, z1, x1 + length - 1, y2, z1 + width - 1, Block(material))
+
+
+def place_3x3_arch(x, y, z, width, length, direction):
+    """Creates a 3x3 'air' opening in the module's 'north', 'south', 'east' or 'west' wall to serve as a passage."""
+    # Calculate starting position based in the center of the specified wall.
+    if direction == 'north':
+        x, y, z = x + width // 2 - 1, y + 1, z
+    elif direction == 'south':
+        x, y, z = x + width // 2 - 1, y + 1, z + length - 1
+    elif direction == 'west':
+        x, y, z = x, y + 1, z + length // 2 - 1
+    elif direction == 'east':
+        x, y, z = x + width - 1, y + 1, z + length // 2 - 1
+    else:
+        return  # Invalid direction
+
+    # Create the 3x3 opening by placing air blocks.
+    if direction in ['north', 'south']:
+        editor.fill(x, y, z, x + 2, y + 2, z, Block("air"))
+    elif direction in ['west', 'east']:
+        editor.fill(x, y, z, x, y + 2, z + 2, Block("air"))
+
+
+def place_door(x, y, z, facing, door_type="dark_oak_door"):
+    """Places a two-block high door."""
+    editor.placeBlock((x, y, z), Block(door_type, {"half": "lower", "facing": facing, "hinge": "left"}))
+    editor.placeBlock((x, y + 1, z), Block(door_type, {"half": "upper", "facing": facing, "hinge": "left"}))
+
+
+def place_stairs(x, y, z, width, length, height, facing, material):
+    """
+    Places a straight staircase within a module, from its floor at y up to the floor above.
+    Call it once per floor of the $ module; the @ module above opens its floor with
+    make_stair_passage_on_floor using the same facing.
+    """
+    base_point_x = (width - height) // 2
+    base_point_z = (length - height) // 2
+    if facing == 'north':
+        x_start = x + width // 2
+        y_start = y + 1
+        z_start = z + base_point_z + height - 2
+        for i in range(height - 1):
+            # Clear space for headroom
+            editor.fill(x_start, y_start + 1, z_start - i, x_start, y_start + height - 1, z_start - i, Block("air"))
+            # Place stair block
+            editor.placeBlock((x_start, y_start + i, z_start - i), Block(material, {"half": "bottom", "facing": facing}))
+            # Railing
+            editor.placeBlock((x_start + 1, y_start, z_start - i), Block("light_gray_stained_glass_pane"))
+            editor.placeBlock((x_start - 1, y_start, z_start - i), Block("light_gray_stained_glass_pane"))
+    elif facing == 'south':
+        x_start = x + width // 2
+        y_start = y + 1
+        z_start = z + base_point_z
+        for i in range(height - 1):
+            # Clear space for headroom
+            editor.fill(x_start, y_start + 1, z_start + i, x_start, y_start + height - 1, z_start + i, Block("air"))
+
+            # Place stair block
+            editor.placeBlock((x_start, y_start + i, z_start + i), Block(material, {"half": "bottom", "facing": facing}))
+
+            # Railing
+            editor.placeBlock((x_start + 1, y_start, z_start + i), Block("light_gray_stained_glass_pane"))
+            editor.placeBlock((x_start - 1, y_start, z_start + i), Block("light_gray_stained_glass_pane"))
+    elif facing == 'west':
+        x_start = x + base_point_x + height - 2
+        y_start = y + 1
+        z_start = z + length // 2
+        for i in range(height - 1):
+            # Clear space for headroom
+            editor.fill(x_start - i, y_start + 1, z_start - 1, x_start - i, y_start + height - 1, z_start + 1, Block("air"))
+
+            # Place stair block
+            editor.placeBlock((x_start - i, y_start + i, z_start), Block(material, {"half": "bottom", "facing": facing}))
+
+            # Railing
+            editor.placeBlock((x_start - i, y_start, z_start + 1), Block("light_gray_stained_glass_pane"))
+            editor.placeBlock((x_start - i, y_start, z_start - 1), Block("light_gray_stained_glass_pane"))
+    elif facing == 'east':
+        x_start = x + base_point_x
+        y_start = y + 1
+        z_start = z + length // 2
+        for i in range(height - 1):
+            # Clear space for headroom
+            editor.fill(x_start + i, y_start + 1, z_start - 1, x_start + i, y_start + height - 1, z_start + 1, Block("air"))
+
+            # Place stair block
+            editor.placeBlock((x_start + i, y_start + i, z_start), Block(material, {"half": "bottom", "facing": facing}))
+
+            # Railing
+            editor.placeBlock((x_start + i, y_start, z_start + 1), Block("light_gray_stained_glass_pane"))
+            editor.placeBlock((x_start + i, y_start, z_start - 1), Block("light_gray_stained_glass_pane"))
+
+def make_stair_passage_on_floor(x, y, z, width, length, height, direction):
+    """
+    Clears a path on a floor for a staircase arriving from below: call it in the @ module after its room,
+    with the same direction as the place_stairs call of the floor below.
+    """
+    base_point_x = (width - height) // 2
+    base_point_z = (length - height) // 2
+    if direction == 'north' or direction == 'south':
+        x_start = x + width // 2
+        z_start = z + base_point_z
+        z_end = z_start + height - 2
+        editor.fill(x_start, y, z_start, x_start, y, z_end, Block("air"))
+        editor.fill(x_start + 1, y + 1, z_start, x_start + 1, y + 1, z_end, Block("light_gray_stained_glass_pane"))
+        editor.fill(x_start - 1, y + 1, z_start, x_start - 1, y + 1, z_end, Block("light_gray_stained_glass_pane"))
+    elif direction == 'east' or direction == 'west':
+        x_start = x + base_point_x
+        z_start = z + length // 2
+        x_end = x_start + height - 2
+        editor.fill(x_start, y, z_start, x_end, y, z_start, Block("air"))
+        editor.fill(x_start, y + 1, z_start + 1, x_end, y + 1, z_start + 1, Block("light_gray_stained_glass_pane"))
+        editor.fill(x_start, y + 1, z_start - 1, x_end, y + 1, z_start - 1, Block("light_gray_stained_glass_pane"))
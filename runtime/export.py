@@ -0,0 +1,188 @@
+# runtime/export.py
+import gzip
+import os
+import struct
+import numpy as np
+from gdpc import Editor
+from runtime.voxel import VoxelEditor, UNTOUCHED, block_name
+
+# Write the build to this file instead of a running server, e.g. BUILD_EXPORT=generated/house.schem.
+EXPORT_PATH = os.getenv("BUILD_EXPORT", "")
+# Minecraft data version stamped into exported files (3465 = 1.20.1).
+DATA_VERSION = int(os.getenv("BUILD_DATA_VERSION", "3465"))
+
+TAG_END, TAG_SHORT, TAG_INT, TAG_BYTE_ARRAY, TAG_STRING, TAG_LIST, TAG_COMPOUND, TAG_INT_ARRAY = 0, 2, 3, 7, 8, 9, 10, 11
+
+
+class Short(int):
+    pass
+
+
+class IntArray(list):
+    pass
+
+
+def tag_type(value) -> int:
+    if isinstance(value, Short):
+        return TAG_SHORT
+    if isinstance(value, int):
+        return TAG_INT
+    if isinstance(value, (bytes, bytearray)):
+        return TAG_BYTE_ARRAY
+    if isinstance(value, str):
+        return TAG_STRING
+    if isinstance(value, IntArray):
+        return TAG_INT_ARRAY
+    if isinstance(value, list):
+        return TAG_LIST
+    if isinstance(value, dict):
+        return TAG_COMPOUND
+    raise TypeError(f"[ERROR] No NBT tag for {type(value).__name__}")
+
+
+def write_string(out: bytearray, text: str) -> None:
+    data = text.encode("utf-8")
+    out += struct.pack(">H", len(data))
+    out += data
+
+
+def write_payload(out: bytearray, value) -> None:
+    kind = tag_type(value)
+    if kind == TAG_SHORT:
+        out += struct.pack(">h", value)
+    elif kind == TAG_INT:
+        out += struct.pack(">i", value)
+    elif kind == TAG_BYTE_ARRAY:
+        out += struct.pack(">i", len(value))
+        out += value
+    elif kind == TAG_STRING:
+        write_string(out, value)
+    elif kind == TAG_INT_ARRAY:
+        out += struct.pack(">i", len(value))
+        out += np.asarray(value, dtype=">i4").tobytes()
+    elif kind == TAG_LIST:
+        out.append(tag_type(value[0]) if value else TAG_END)
+        out += struct.pack(">i", len(value))
+        for item in value:
+            write_payload(out, item)
+    else:
+        for name, item in value.items():
+            out.append(tag_type(item))
+            write_string(out, name)
+            write_payload(out, item)
+        out.append(TAG_END)
+
+
+def write_nbt(filepath: str, root_name: str, root: dict) -> None:
+    """Write root as a gzipped NBT file, through a temporary file like the checkpoints."""
+    out = bytearray([TAG_COMPOUND])
+    write_string(out, root_name)
+    write_payload(out, root)
+    os.makedirs(os.path.dirname(filepath) or ".", exist_ok=True)
+    tmp_path = filepath + ".tmp"
+    with gzip.open(tmp_path, "wb") as f:
+        f.write(out)
+    os.replace(tmp_path, filepath)
+
+
+def encode_varints(values: np.ndarray) -> bytes:
+    """Sponge schematic BlockData: one LEB128 varint per block, a plain byte per block while the palette is < 128."""
+    if values.max(initial=0) < 0x80:
+        return values.astype(np.uint8).tobytes()
+    out = bytearray()
+    for value in values.tolist():
+        while value >= 0x80:
+            out.append(value & 0x7F | 0x80)
+            value >>= 7
+        out.append(value)
+    return bytes(out)
+
+
+def block_state(block) -> str:
+    states = ",".join(f"{key}={value}" for key, value in sorted((block.states or {}).items()))
+    return f"{block_name(block)}[{states}]" if states else block_name(block)
+
+
+class ExportEditor(VoxelEditor):
+    """
+    VoxelEditor that writes the build to a structure file on flushBuffer() instead of sending it to a server:
+    a Sponge schematic (.schem, WorldEdit) or a vanilla structure (.nbt, structure blocks).
+    Each flush overwrites the file with everything placed so far.
+    """
+
+    def __init__(self, filepath: str):
+        if not filepath.endswith((".schem", ".nbt")):
+            raise ValueError(f"[ERROR] Unsupported export format (use .schem or .nbt): {filepath}")
+        self.filepath = filepath
+        self.editor = None
+        self.reset()
+
+    def flushBuffer(self) -> None:
+        trimmed = self.trimmed()
+        if trimmed is None:
+            return
+        origin, volume = trimmed
+        # Palette compression: only the palette entries this building uses, renumbered densely.
+        used = np.unique(volume)
+        remap = np.zeros(len(self.palette), dtype=np.uint32)
+        remap[used] = np.arange(len(used))
+        local = remap[volume]
+        if self.filepath.endswith(".schem"):
+            self.write_schematic(origin, volume.shape, used, local)
+        else:
+            self.write_structure(volume.shape, used, local)
+        blocks = np.count_nonzero(volume != UNTOUCHED)
+        print(f"Exported {blocks} blocks ({volume.shape[0]}x{volume.shape[1]}x{volume.shape[2]}, "
+              f"{np.count_nonzero(used != UNTOUCHED)} block states, {self.writes - blocks} overwritten writes dropped) "
+              f"to: {self.filepath}")
+
+    def write_schematic(self, origin, shape, used, local) -> None:
+        # Untouched cells become air in a schematic (paste with //paste -a to keep the terrain there).
+        palette = {}
+        states = [palette.setdefault("minecraft:air" if index == UNTOUCHED else block_state(self.palette[index]),
+                                     len(palette))
+                  for index in used]
+        local = np.asarray(states, dtype=np.uint32)[local]
+        width, height, length = shape
+        write_nbt(self.filepath, "Schematic", {
+            "Version": 2,
+            "DataVersion": DATA_VERSION,
+            "Width": Short(width),
+            "Height": Short(height),
+            "Length": Short(length),
+            "Offset": IntArray([0, 0, 0]),
+            "Metadata": {"WEOffsetX": 0, "WEOffsetY": 0, "WEOffsetZ": 0,
+                         "BuildOrigin": IntArray([int(v) for v in origin])},
+            "PaletteMax": len(palette),
+            "Palette": palette,
+            # Sponge order is x fastest, then z, then y.
+            "BlockData": encode_varints(local.transpose(1, 2, 0).ravel()),
+        })
+
+    def write_structure(self, shape, used, local) -> None:
+        # Untouched cells are left out, so a structure block keeps whatever is already there.
+        palette = []
+        for index in used:
+            block = self.palette[index] if index != UNTOUCHED else None
+            entry = {"Name": block_name(block) if block else "minecraft:structure_void"}
+            if block and block.states:
+                entry["Properties"] = {key: str(value) for key, value in block.states.items()}
+            palette.append(entry)
+        positions = np.argwhere(used[local] != UNTOUCHED)
+        write_nbt(self.filepath, "", {
+            "DataVersion": DATA_VERSION,
+            "size": [int(v) for v in shape],
+            "palette": palette,
+            "blocks": [{"pos": [x, y, z], "state": int(local[x, y, z])} for x, y, z in positions.tolist()],
+            "entities": [],
+        })
+
+
+def make_editor():
+    """
+    The editor generated scripts build with: an ExportEditor when BUILD_EXPORT names a .schem/.nbt file,
+    otherwise a VoxelEditor in front of a buffered gdpc Editor talking to the running game.
+    """
+    if EXPORT_PATH:
+        return ExportEditor(EXPORT_PATH)
+    return VoxelEditor(Editor(buffering=True))
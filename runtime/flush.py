@@ -0,0 +1,77 @@
+# runtime/flush.py
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from gdpc import interface
+
+# Concurrent /blocks requests to the GDMC HTTP interface.
+FLUSH_WORKERS = int(os.getenv("BUILD_FLUSH_WORKERS", "4"))
+# Attempts per request before its chunk is reported as failed.
+FLUSH_RETRIES = int(os.getenv("BUILD_FLUSH_RETRIES", "3"))
+# Sections of the same chunk are packed into one request up to this many blocks.
+MAX_REQUEST_BLOCKS = 4096
+SECTION_SHIFT = 4
+
+
+def section_requests(pending):
+    """
+    Turn [(block, N x 3 positions)] into requests of [(position, block)], grouped by 16x16x16 chunk section:
+    chunk by chunk, sections bottom-up, consecutive sections of one chunk packed up to MAX_REQUEST_BLOCKS.
+    Returns [((chunk x, chunk z), blocks)].
+    """
+    pending = [(block, coords) for block, coords in pending if len(coords)]
+    if not pending:
+        return []
+    coords = np.concatenate([coords for _, coords in pending])
+    owners = np.concatenate([np.full(len(c), i) for i, (_, c) in enumerate(pending)])
+    sections = coords >> SECTION_SHIFT
+    order = np.lexsort((sections[:, 1], sections[:, 2], sections[:, 0]))
+    coords, owners, sections = coords[order], owners[order], sections[order]
+    _, starts = np.unique(sections, axis=0, return_index=True)
+    starts = np.sort(starts)
+
+    requests = []
+    for start, stop in zip(starts, [*starts[1:], len(coords)]):
+        chunk = (int(sections[start, 0]), int(sections[start, 2]))
+        blocks = [(tuple(p), pending[o][0]) for p, o in zip(coords[start:stop].tolist(), owners[start:stop].tolist())]
+        if requests and requests[-1][0] == chunk and len(requests[-1][1]) + len(blocks) <= MAX_REQUEST_BLOCKS:
+            requests[-1][1].extend(blocks)
+        else:
+            requests.append((chunk, blocks))
+    return requests
+
+
+def send_request(editor, blocks, retries: int):
+    """
+    PUT one request, retrying it alone on connection errors. Returns (placed, [error messages]).
+    """
+    for attempt in range(retries):
+        try:
+            results = interface.placeBlocks(blocks, dimension=editor.dimension, doBlockUpdates=editor.doBlockUpdates,
+                                            spawnDrops=editor.spawnDrops, timeout=editor.timeout, host=editor.host)
+            return sum(1 for success, _ in results if success), [result for success, result in results if not success]
+        except Exception as e:
+            if attempt == retries - 1:
+                return 0, [str(e)] * len(blocks)
+            time.sleep(2 ** attempt)
+
+
+def flush_sections(editor, pending, workers: int = FLUSH_WORKERS, retries: int = FLUSH_RETRIES) -> int:
+    """
+    Send pending blocks chunk by chunk over up to `workers` concurrent connections; a failed request only
+    loses its own chunk. Returns how many blocks were placed.
+    """
+    requests = section_requests(pending)
+    if not requests:
+        return 0
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        results = list(pool.map(lambda request: send_request(editor, request[1], max(1, retries)), requests))
+
+    placed = sum(count for count, _ in results)
+    failed = [(chunk, errors) for (chunk, _), (_, errors) in zip(requests, results) if errors]
+    if failed:
+        chunks = sorted({chunk for chunk, _ in failed})
+        print(f"Warning: {sum(len(errors) for _, errors in failed)} blocks in {len(chunks)} chunks were not placed "
+              f"(first error: {failed[0][1][0]}). Chunks: {chunks}")
+    return placed
@@ -0,0 +1,184 @@
+# runtime/voxel.py
+import os
+import numpy as np
+from gdpc import Editor, Block, Transform
+from gdpc.vector_tools import Rect
+from runtime.flush import flush_sections
+
+# Volumes grow by at least this many blocks per side, so a building drawn room by room reallocates rarely.
+GROW_MARGIN = 16
+UNTOUCHED = 0
+# Before flushing, read the building's area once and skip blocks the world already has (0 = send everything).
+DIFF_WORLD = os.getenv("BUILD_DIFF_WORLD", "1") == "1"
+
+
+def block_key(block: Block):
+    return block.id, tuple(sorted((block.states or {}).items())), block.data
+
+
+def block_name(block: Block) -> str:
+    return block.id if ":" in block.id else "minecraft:" + block.id
+
+
+def same_block(placed: Block, existing: Block) -> bool:
+    """
+    Whether placing `placed` would leave `existing` as it is. States must match exactly, since states left
+    out of `placed` fall back to defaults that may differ from the world's; block entity data never matches.
+    """
+    return (not placed.data and block_name(placed) == block_name(existing)
+            and {key: str(value) for key, value in (placed.states or {}).items()} == dict(existing.states or {}))
+
+
+class VoxelEditor:
+    """
+    Drop-in replacement for a buffered gdpc Editor in generated build scripts. Blocks are rasterized into
+    a 3D uint16 array of palette indices (0 = untouched) that grows to fit the building; flushBuffer()
+    then hands every palette entry to gdpc in one placeBlock call with all its positions.
+    Later writes overwrite earlier ones, exactly as with sequential placeBlock calls.
+    """
+
+    def __init__(self, editor: Editor = None):
+        self.editor = editor if editor is not None else Editor(buffering=True)
+        self.reset()
+
+    def reset(self) -> None:
+        self.palette = [None]
+        self.palette_index = {}
+        self.origin = None
+        self.volume = None
+        self.writes = 0
+
+    def __getattr__(self, name):
+        # Anything else (getBuildArea, runCommand, ...) goes straight to the wrapped gdpc Editor.
+        editor = self.__dict__.get("editor")
+        if editor is None:
+            raise AttributeError(f"{type(self).__name__} has no live gdpc Editor for '{name}'")
+        return getattr(editor, name)
+
+    def block_index(self, block) -> int:
+        if isinstance(block, str):
+            block = Block(block)
+        key = block_key(block)
+        if key not in self.palette_index:
+            if len(self.palette) > np.iinfo(np.uint16).max:
+                raise ValueError("[ERROR] More distinct blocks than the voxel palette can hold.")
+            self.palette_index[key] = len(self.palette)
+            self.palette.append(block)
+        return self.palette_index[key]
+
+    def ensure_bounds(self, low, high) -> None:
+        """Grow the volume so the inclusive box low..high fits."""
+        low, high = np.asarray(low), np.asarray(high)
+        if self.volume is None:
+            self.origin = low - GROW_MARGIN
+            self.volume = np.zeros(high - low + 1 + 2 * GROW_MARGIN, dtype=np.uint16)
+            return
+
+        end = self.origin + self.volume.shape
+        if (low >= self.origin).all() and (high < end).all():
+            return
+        new_origin = np.where(low < self.origin, low - GROW_MARGIN, self.origin)
+        new_end = np.where(high >= end, high + 1 + GROW_MARGIN, end)
+        volume = np.zeros(new_end - new_origin, dtype=np.uint16)
+        offset = self.origin - new_origin
+        volume[tuple(slice(o, o + s) for o, s in zip(offset, self.volume.shape))] = self.volume
+        self.origin, self.volume = new_origin, volume
+
+    def fill(self, x1, y1, z1, x2, y2, z2, block) -> None:
+        """
+        Fill the box between two corners, both inclusive (like /fill), with one block in a single slice assignment.
+        """
+        low = np.minimum((x1, y1, z1), (x2, y2, z2))
+        high = np.maximum((x1, y1, z1), (x2, y2, z2))
+        self.ensure_bounds(low, high)
+        start = low - self.origin
+        stop = high - self.origin + 1
+        self.volume[start[0]:stop[0], start[1]:stop[1], start[2]:stop[2]] = self.block_index(block)
+        self.writes += int(np.prod(stop - start))
+
+    def placeBlock(self, position, block) -> None:
+        x, y, z = position
+        if self.volume is None or not all(0 <= v - o < s for v, o, s in zip((x, y, z), self.origin, self.volume.shape)):
+            self.ensure_bounds((x, y, z), (x, y, z))
+        self.volume[x - self.origin[0], y - self.origin[1], z - self.origin[2]] = self.block_index(block)
+        self.writes += 1
+
+    def trimmed(self):
+        """(origin, volume view) cropped to the touched blocks, or None if nothing was placed."""
+        if self.volume is None:
+            return None
+        touched = self.volume != UNTOUCHED
+        ranges = []
+        for axis in range(3):
+            used = np.flatnonzero(touched.any(axis=tuple(a for a in range(3) if a != axis)))
+            if not len(used):
+                return None
+            ranges.append((used[0], used[-1] + 1))
+        origin = self.origin + [start for start, _ in ranges]
+        return origin, self.volume[tuple(slice(start, stop) for start, stop in ranges)]
+
+    def pending_blocks(self):
+        """
+        [(block, N x 3 array of positions)] for every palette entry still in the volume: the last write
+        to each position only, however often the build script overwrote it.
+        """
+        if self.volume is None:
+            return []
+        flat = np.flatnonzero(self.volume != UNTOUCHED)
+        values = self.volume.ravel()[flat]
+        order = np.argsort(values, kind="stable")
+        flat, values = flat[order], values[order]
+        coords = np.stack(np.unravel_index(flat, self.volume.shape), axis=1) + self.origin
+        indices, starts = np.unique(values, return_index=True)
+        return [(self.palette[index], coords[start:stop])
+                for index, start, stop in zip(indices, starts, [*starts[1:], len(values)])]
+
+    def load_world_blocks(self):
+        """
+        A gdpc WorldSlice over the building's footprint to diff against, or None when diffing is off, the
+        editor is transformed (slices are read in global coordinates) or the world cannot be read.
+        """
+        trimmed = self.trimmed()
+        if not DIFF_WORLD or trimmed is None or self.editor.transform != Transform():
+            return None
+        origin, volume = trimmed
+        try:
+            return self.editor.loadWorldSlice(Rect((int(origin[0]), int(origin[2])), (volume.shape[0], volume.shape[2])))
+        except Exception as e:
+            print(f"Warning: could not read the world to skip unchanged blocks, sending all of them: {e}")
+            return None
+
+    def flushBuffer(self) -> None:
+        """
+        Send the rasterized building to the server, then start a new volume. Overwritten writes never leave
+        the volume, blocks identical to the world's are dropped, and the rest goes out chunk by chunk over
+        parallel requests (runtime/flush.py). A transformed editor gets one bulk placeBlock per palette entry.
+        """
+        if self.volume is not None:
+            world = self.load_world_blocks()
+            pending = []
+            unchanged = 0
+            for block, coords in self.pending_blocks():
+                if world is not None:
+                    keep = np.array([not same_block(block, world.getBlockGlobal(tuple(p))) for p in coords.tolist()],
+                                    dtype=bool)
+                    unchanged += len(coords) - int(keep.sum())
+                    coords = coords[keep]
+                pending.append((block, coords))
+            net = sum(len(coords) for _, coords in pending)
+
+            if self.editor.transform == Transform():
+                sent = flush_sections(self.editor, pending)
+            else:
+                sent = 0
+                for block, coords in pending:
+                    if len(coords):
+                        self.editor.placeBlock([tuple(p) for p in coords.tolist()], block)
+                        sent += len(coords)
+            print(f"Flushed {sent} of {net} changed blocks ({self.writes} writes: "
+                  f"{self.writes - net - unchanged} overwritten, {unchanged} already in the world)")
+            self.origin = None
+            self.volume = None
+            self.writes = 0
+        if self.editor.buffering:
+            self.editor.flushBuffer()
@@ -0,0 +1,120 @@
+import contextvars
+import os
+import threading
+from contextlib import contextmanager
+from utils.pricing import token_cost
+
+# Spending ceilings in USD, 0 meaning none: for a whole batch, for one building, and for any one stage.
+BATCH_BUDGET = float(os.getenv("BATCH_BUDGET", "0"))
+BUILDING_BUDGET = float(os.getenv("BUILDING_BUDGET", "0"))
+STAGE_BUDGET = float(os.getenv("STAGE_BUDGET", "0"))
+# Per-stage overrides, e.g. STAGE_BUDGETS="Code Writing=0.10,JSON Construction=0.02".
+STAGE_BUDGETS = {
+    name.strip(): float(limit)
+    for name, limit in (item.split("=", 1) for item in os.getenv("STAGE_BUDGETS", "").split(",") if "=" in item)
+}
+# What a request that would overspend does: "abort" raises BudgetExceeded, "downgrade" sends it to
+# BUDGET_DOWNGRADE_MODEL instead if that still fits (and aborts otherwise).
+BUDGET_ACTION = os.getenv("BUDGET_ACTION", "abort")
+BUDGET_DOWNGRADE_MODEL = os.getenv("BUDGET_DOWNGRADE_MODEL", "gemini-2.5-flash")
+# A request's cost is estimated before it is sent from its prompt (about 4 characters per token)
+# and this many output tokens; the estimate is held against the budgets until the real cost is known.
+OUTPUT_TOKEN_ESTIMATE = int(os.getenv("OUTPUT_TOKEN_ESTIMATE", "2048"))
+CHARS_PER_TOKEN = 4
+
+
+class BudgetExceeded(RuntimeError):
+    pass
+
+
+class Budget:
+    """
+    A spending ceiling shared by every request made inside its scope, from any thread or task.
+    """
+
+    def __init__(self, name: str, limit: float):
+        self.name = name
+        self.limit = limit
+        self.spent = 0.0
+        self.lock = threading.Lock()
+
+    def fits(self, cost: float) -> bool:
+        return self.spent + cost <= self.limit
+
+
+_active_budgets = contextvars.ContextVar("active_budgets", default=())
+
+
+@contextmanager
+def budget_scope(name: str, limit: float):
+    """Requests made inside the body (and in tasks and threads started from it) count against limit."""
+    if limit <= 0:
+        yield None
+        return
+    budget = Budget(name, limit)
+    token = _active_budgets.set(_active_budgets.get() + (budget,))
+    try:
+        yield budget
+    finally:
+        _active_budgets.reset(token)
+
+
+def stage_budget(stage_name: str) -> float:
+    return STAGE_BUDGETS.get(stage_name, STAGE_BUDGET)
+
+
+def estimate_cost(model_name: str, prompt_text: str) -> float:
+    return token_cost(model_name, len(prompt_text) // CHARS_PER_TOKEN, OUTPUT_TOKEN_ESTIMATE)
+
+
+class Reservation:
+    """
+    The estimated cost of one request, held against every active budget until settle() replaces it
+    with the real cost; a request that fails releases it.
+    """
+
+    def __init__(self, budgets, cost: float):
+        self.budgets = budgets
+        self.cost = cost
+
+    def settle(self, cost: float) -> None:
+        for budget in self.budgets:
+            with budget.lock:
+                budget.spent += cost - self.cost
+        self.cost = 0.0
+        self.budgets = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.settle(0.0)
+
+
+def reserve(model_name: str, prompt_text: str):
+    """
+    Check the next request against the active budgets and hold its estimated cost.
+    Returns (model name to send it to, Reservation); raises BudgetExceeded when it cannot fit.
+    """
+    budgets = _active_budgets.get()
+    candidates = [model_name]
+    if BUDGET_ACTION == "downgrade" and BUDGET_DOWNGRADE_MODEL and BUDGET_DOWNGRADE_MODEL != model_name:
+        candidates.append(BUDGET_DOWNGRADE_MODEL)
+    for candidate in candidates:
+        estimate = estimate_cost(candidate, prompt_text)
+        locks = [budget.lock for budget in budgets]
+        for lock in locks:
+            lock.acquire()
+        try:
+            if all(budget.fits(estimate) for budget in budgets):
+                for budget in budgets:
+                    budget.spent += estimate
+                if candidate != model_name:
+                    print(f"Warning: budget nearly spent, downgrading a {model_name} request to {candidate}.")
+                return candidate, Reservation(budgets, estimate)
+        finally:
+            for lock in reversed(locks):
+                lock.release()
+    over = next((budget for budget in budgets if not budget.fits(estimate_cost(model_name, prompt_text))), budgets[0])
+    raise BudgetExceeded(f"[ERROR] The {over.name} budget of ${over.limit:.4f} would be exceeded "
+                         f"(spent ${over.spent:.4f}, next {model_name} request ~${estimate_cost(model_name, prompt_text):.4f}).")
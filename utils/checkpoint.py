@@ -0,0 +1,58 @@
+import json
+import os
+
+RUNS_DIR = "generated/runs"
+RUN_INPUT_FILE = "input.json"
+
+
+def get_run_dir(run_id: str) -> str:
+    return os.path.join(RUNS_DIR, run_id)
+
+
+def write_json(data, filepath: str) -> None:
+    """
+    Write JSON through a temporary file so an interrupted run never leaves a half-written checkpoint.
+    """
+    os.makedirs(os.path.dirname(filepath), exist_ok=True)
+    tmp_path = filepath + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, filepath)
+
+
+def save_run_input(run_dir: str, run_input: dict) -> None:
+    write_json(run_input, os.path.join(run_dir, RUN_INPUT_FILE))
+
+
+def load_run_input(run_dir: str) -> dict:
+    filepath = os.path.join(run_dir, RUN_INPUT_FILE)
+    if not os.path.exists(filepath):
+        raise FileNotFoundError(f"[ERROR] No run to resume at: {run_dir}")
+    with open(filepath, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_stage_checkpoint(run_dir: str, stage, content, usage, duration: float) -> None:
+    """
+    Persist one finished stage as <run_dir>/<stage output>.json.
+    """
+    write_json({
+        "stage": stage.name,
+        "output": stage.output,
+        "content": content,
+        "usage": dict(usage or {}),
+        "duration": duration,
+    }, os.path.join(run_dir, f"{stage.output}.json"))
+
+
+def load_stage_checkpoints(run_dir: str, stages) -> dict:
+    """
+    Return {stage output: checkpoint} for every stage of the pipeline that already finished in run_dir.
+    """
+    checkpoints = {}
+    for stage in stages:
+        filepath = os.path.join(run_dir, f"{stage.output}.json")
+        if os.path.exists(filepath):
+            with open(filepath, "r", encoding="utf-8") as f:
+                checkpoints[stage.output] = json.load(f)
+    return checkpoints
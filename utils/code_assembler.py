@@ -0,0 +1,153 @@
+import ast
+import re
+from utils.layout_grid import STAIR, STAIR_TOP, module_sort_key
+
+MASTER_FUNCTION = "build_building"
+SPECIAL_MODULE_NAMES = {STAIR: "stair_room", STAIR_TOP: "end_stair_room"}
+# Modules generated by separate calls cannot agree on a stair direction, so it is fixed.
+STAIR_DIRECTION = "north"
+
+
+def library_reference(library_code: str) -> str:
+    """
+    The runtime library as the prompts show it: the signature and docstring of every utility function.
+    """
+    tree = ast.parse(library_code)
+    parts = []
+    for node in tree.body:
+        if isinstance(node, ast.FunctionDef):
+            docstring = ast.get_docstring(node) or ""
+            body = "\n".join(f"    {line}" if line else "" for line in f'"""{docstring}"""'.split("\n"))
+            parts.append(f"def {node.name}({ast.unparse(node.args)}):\n{body}")
+    return "\n\n".join(parts)
+
+
+def example_sections(example_code: str):
+    """
+    Split the SAMPLE CODE into the parts every assembled script reuses verbatim: the header (imports of
+    the runtime library, room constants) and the main block with the master function's name.
+    """
+    lines = example_code.split("\n")
+
+    def line_of(marker):
+        return next(i for i, line in enumerate(lines) if line.startswith(marker))
+
+    materials = line_of("# Define building materials")
+    modules = line_of("# === Module Functions ===")
+    master = line_of("# === Master Build Function ===")
+    main = line_of("# === Main Execution Block ===")
+
+    main_tree = ast.parse("\n".join(lines[main:]))
+    example_master = next(node.func.id for node in ast.walk(main_tree)
+                          if isinstance(node, ast.Call) and getattr(node.func, "id", "").startswith("build_"))
+    return {
+        "header": "\n".join(lines[:materials]).rstrip(),
+        "module_header": "\n".join(lines[modules:modules + 2]).rstrip(),
+        "master_header": lines[master],
+        "main": "\n".join(lines[main:]).replace(example_master, MASTER_FUNCTION).rstrip(),
+    }
+
+
+def module_function_names(plan):
+    """
+    {module code: build_* function name} from the module names in the plan, e.g. A -> build_hearthstone_living_room.
+    """
+    names = {}
+    for record in sorted(plan.modules, key=lambda r: module_sort_key(r.code)):
+        if record.code in names:
+            continue
+        words = re.findall(r"[a-z0-9]+", record.name.lower()) or \
+            [SPECIAL_MODULE_NAMES.get(record.code, f"module_{record.code.lower()}")]
+        name = "build_" + "_".join(words)
+        if name in names.values() or name == MASTER_FUNCTION:
+            name += f"_{len(names)}"
+        names[record.code] = name
+    return names
+
+
+def module_placement(plan, code: str) -> str:
+    """
+    What one module function has to build, from the plan: the floors it spans relative to its (x, y, z),
+    the arch of every passage, roofs, and for the stair modules the fixed stair direction.
+    """
+    records = sorted((r for r in plan.modules if r.code == code), key=lambda r: r.floor)
+    lowest = records[0].floor
+    lines = [f"Module {code} ({records[0].name or SPECIAL_MODULE_NAMES.get(code, 'module')}), "
+             f"layout row {records[0].row + 1}, column {records[0].col + 1}."]
+    for record in records:
+        passages = ", ".join(f"{direction} to {other}" for direction, other in record.links) or "none"
+        line = f"- {record.floor + 1}F at y + {record.floor - lowest} * ROOM_HEIGHT: passages {passages}"
+        if record.top_floor:
+            line += "; top floor, add a roof"
+        lines.append(line)
+    if code == STAIR:
+        lines.append(f"- Stairs: call place_stairs(..., '{STAIR_DIRECTION}', ...) on each of these floors, "
+                     "leading up to the floor above.")
+    elif code == STAIR_TOP:
+        lines.append(f"- Stairs arrive from below: call make_stair_passage_on_floor(..., '{STAIR_DIRECTION}') "
+                     "and do not build stairs.")
+    return "\n".join(lines)
+
+
+def master_function(plan, function_names) -> str:
+    """
+    The master build function: every module called once, at the lowest floor it occupies, offset by its
+    layout cell. Floors go bottom-up, so the staircase ($) is always built before its top landing (@).
+    """
+    lines = [f"def {MASTER_FUNCTION}(x, y, z):",
+             '    """Constructs the entire building by calling the module functions based on the layout."""']
+    built = set()
+    for floor in range(plan.grid.floors):
+        lines.append(f"    # Floor {floor + 1} Layout")
+        lines.extend(f"    # {row}" for row in plan.grid.floor_rows(floor))
+        for record in sorted((r for r in plan.modules if r.floor == floor), key=lambda r: (r.row, r.col)):
+            if record.code in built:
+                continue
+            built.add(record.code)
+            lines.append(f"    {function_names[record.code]}(x + {record.col} * ROOM_WIDTH, y + {floor} * ROOM_HEIGHT, "
+                         f"z + {record.row} * ROOM_LENGTH)  # Module {record.code}")
+        lines.append("")
+    lines.append('    print(f"Building construction initiated at ({x}, {y}, {z}).")')
+    return "\n".join(lines)
+
+
+def assemble_script(example_code: str, plan, module_functions) -> str:
+    """
+    Put a full build script together from the SAMPLE CODE's header and main block, the module functions
+    ({module code: function source}) and a deterministic master function.
+    """
+    sections = example_sections(example_code)
+    function_names = module_function_names(plan)
+    parts = [sections["header"], sections["module_header"]]
+    parts.extend(module_functions[code].strip("\n") for code in function_names if code in module_functions)
+    parts.append(sections["master_header"] + "\n" + master_function(plan, function_names))
+    parts.append(sections["main"])
+    return "\n\n\n".join(parts) + "\n"
+
+
+def extract_function(code: str, function_name: str):
+    """Source of the top-level function `function_name` in code (or of its only function), or None."""
+    try:
+        tree = ast.parse(code)
+    except SyntaxError:
+        return None
+    functions = [node for node in tree.body if isinstance(node, ast.FunctionDef)]
+    match = next((node for node in functions if node.name == function_name), None)
+    if match is None and len(functions) == 1:
+        match = functions[0]
+        match.name = function_name
+    if match is None:
+        return None
+    lines = code.split("\n")
+    source = "\n".join(lines[match.lineno - 1:match.end_lineno])
+    return re.sub(r"^def \w+\(", f"def {function_name}(", source, count=1)
+
+
+def split_module_functions(code: str, function_names):
+    """{module code: function source} of the functions named in function_names ({module code: name}) in a script."""
+    functions = {}
+    for module_code, function_name in function_names.items():
+        source = extract_function(code, function_name)
+        if source:
+            functions[module_code] = source
+    return functions
@@ -0,0 +1,161 @@
+from utils.layout_grid import DIRECTIONS, EMPTY, STAIR, STAIR_TOP
+from utils.code_assembler import STAIR_DIRECTION, SPECIAL_MODULE_NAMES, module_function_names
+
+# Used when the structure JSON names no usable block for a part of a module.
+DEFAULT_MATERIALS = {"wall": "oak_planks", "floor": "spruce_planks", "ceiling": "spruce_planks", "roof": "dark_oak_planks"}
+DOOR_BLOCK = "oak_door"
+STAIR_BLOCK = "oak_stairs"
+# Materials of a wall description used for the corner posts rather than the wall itself.
+FRAME_SUFFIXES = ("_log", "_wood", "_pillar")
+# Side of a first-floor module that gets the front door when the JSON describes no exit.
+EXIT_ORDER = ("south", "north", "east", "west")
+
+DOOR_POSITIONS = {
+    "north": "x + ROOM_WIDTH // 2, {y} + 1, z",
+    "south": "x + ROOM_WIDTH // 2, {y} + 1, z + ROOM_LENGTH - 1",
+    "west": "x, {y} + 1, z + ROOM_LENGTH // 2",
+    "east": "x + ROOM_WIDTH - 1, {y} + 1, z + ROOM_LENGTH // 2",
+}
+CORNERS = (("x", "z"), ("x + ROOM_WIDTH - 1", "z"), ("x", "z + ROOM_LENGTH - 1"),
+           ("x + ROOM_WIDTH - 1", "z + ROOM_LENGTH - 1"))
+LIGHTS = ("x + 2, {y} + ROOM_HEIGHT - 2, z + 2", "x + ROOM_WIDTH - 3, {y} + ROOM_HEIGHT - 2, z + 2",
+          "x + 2, {y} + ROOM_HEIGHT - 2, z + ROOM_LENGTH - 3", "x + ROOM_WIDTH - 3, {y} + ROOM_HEIGHT - 2, z + ROOM_LENGTH - 3")
+
+
+def furnish_function_names(plan):
+    """{module code: furnish_* function name} of the modules the model furnishes; the stair modules have none."""
+    return {code: "furnish_" + name.removeprefix("build_")
+            for code, name in module_function_names(plan).items() if code not in (STAIR, STAIR_TOP)}
+
+
+def module_materials(plan, records):
+    """wall, frame (corner posts, may be None), floor, ceiling and roof block IDs of a module, from its plan records."""
+    def first(field, keep=lambda name: True):
+        for record in records:
+            for material in getattr(record, field):
+                name = plan.materials.name(material)
+                if name and keep(name):
+                    return name
+        return None
+
+    is_frame = lambda name: name.endswith(FRAME_SUFFIXES)
+    wall = first("walls", lambda name: not is_frame(name)) or first("walls") or DEFAULT_MATERIALS["wall"]
+    frame = first("walls", is_frame)
+    floor = first("foundation", lambda name: "slab" not in name) or DEFAULT_MATERIALS["floor"]
+    ceiling = first("ceiling", lambda name: name != "air") or DEFAULT_MATERIALS["ceiling"]
+    return {"wall": wall, "frame": frame if frame != wall else None, "floor": floor, "ceiling": ceiling,
+            "roof": first("roof") or DEFAULT_MATERIALS["roof"]}
+
+
+def stair_block(plan, records) -> str:
+    for record in records:
+        for material in (*record.furniture, *record.walls, *record.foundation):
+            if plan.materials.name(material).endswith("_stairs"):
+                return plan.materials.name(material)
+    return STAIR_BLOCK
+
+
+def exterior_doors(plan, entries):
+    """
+    {module code: wall direction} of the first-floor front doors: the entrances in the structure JSON that
+    lead out of the building, or else one outside wall of the first ground-floor room.
+    """
+    def outside(record):
+        return [direction for direction, d_row, d_col in DIRECTIONS
+                if plan.grid.at(record.floor, record.row + d_row, record.col + d_col) == EMPTY]
+
+    ground = [record for record in plan.floor_modules(0) if record.code not in (STAIR, STAIR_TOP)]
+    doors = {}
+    for record in ground:
+        entrances = (entries.get(record.code) or {}).get("entrances") or {}
+        sides = [side for side in outside(record) if isinstance(entrances, dict) and side in entrances]
+        if sides:
+            doors[record.code] = sides[0]
+    if not doors:
+        for record in ground:
+            sides = [side for side in EXIT_ORDER if side in outside(record)]
+            if sides:
+                doors[record.code] = sides[0]
+                break
+    return doors
+
+
+def module_title(record) -> str:
+    return record.name or SPECIAL_MODULE_NAMES.get(record.code, f"module {record.code}").replace("_", " ")
+
+
+def floor_y(offset: int) -> str:
+    return "y" if offset == 0 else f"y + {offset} * ROOM_HEIGHT"
+
+
+def module_skeleton(plan, code: str, function_name: str, furnish_name, door, names) -> str:
+    """
+    The build function of one module without its furniture: on every floor it spans the room shell with
+    corner posts, an arch per passage, the front door and corner lights; stairs for $ and @, a solid hipped
+    roof on top floors, and a call to the model-written furnish function.
+    """
+    records = sorted((r for r in plan.modules if r.code == code), key=lambda r: r.floor)
+    materials = module_materials(plan, records)
+    lowest = records[0].floor
+    title = module_title(records[0])
+    stairs = []
+    lines = [f"def {function_name}(x, y, z):  # Module {code}",
+             f'    """Builds {title} ({", ".join(f"{r.floor + 1}F" for r in records)}) from the layout."""']
+    for record in records:
+        y = floor_y(record.floor - lowest)
+        lines.append(f"    # {record.floor + 1}F")
+        lines.append(f'    place_filled_room(x, {y}, z, ROOM_WIDTH, ROOM_LENGTH, ROOM_HEIGHT, "{materials["wall"]}", '
+                     f'"{materials["floor"]}", "{materials["ceiling"]}")')
+        if materials["frame"]:
+            lines.extend(f'    editor.fill({cx}, {y} + 1, {cz}, {cx}, {y} + ROOM_HEIGHT - 2, {cz}, Block("{materials["frame"]}"))'
+                         for cx, cz in CORNERS)
+        for direction, other in record.links:
+            lines.append(f"    place_3x3_arch(x, {y}, z, ROOM_WIDTH, ROOM_LENGTH, '{direction}')  # To {names.get(other, other)} ({other})")
+        if door and record.floor == 0:
+            lines.append(f"    place_door({DOOR_POSITIONS[door].format(y=y)}, '{door}', \"{DOOR_BLOCK}\")  # Front door")
+        lines.append("    # Lighting must not be less than 4 units.")
+        lines.extend(f'    editor.placeBlock(({light.format(y=y)}), Block("lantern"))' for light in LIGHTS)
+        if code == STAIR:
+            # After every floor's room, so an upper room's floor does not close the stairs below it.
+            stairs.append(f"    place_stairs(x, {y}, z, ROOM_WIDTH, ROOM_LENGTH, ROOM_HEIGHT, '{STAIR_DIRECTION}', "
+                         f'"{stair_block(plan, records)}")')
+        elif code == STAIR_TOP:
+            lines.append("    # Create hole for the stairs from below (Do not omit this step)")
+            lines.append(f"    make_stair_passage_on_floor(x, {y}, z, ROOM_WIDTH, ROOM_LENGTH, ROOM_HEIGHT, '{STAIR_DIRECTION}')")
+        if record.top_floor:
+            lines.append("    # Roof: solid layers stepping inwards, inside the module's own footprint")
+            lines.append("    for i in range(min(ROOM_WIDTH, ROOM_LENGTH) // 2):")
+            lines.append(f"        editor.fill(x + i, {y} + ROOM_HEIGHT + i, z + i, x + ROOM_WIDTH - 1 - i, "
+                         f'{y} + ROOM_HEIGHT + i, z + ROOM_LENGTH - 1 - i, Block("{materials["roof"]}"))')
+    if stairs:
+        lines.append(f"    # Stairs, facing {STAIR_DIRECTION.capitalize()}")
+        lines.extend(stairs)
+    if furnish_name:
+        lines.append("    # Furniture and decoration")
+        lines.append(f"    {furnish_name}(x, y, z)")
+    return "\n".join(lines)
+
+
+def module_skeletons(plan, entries):
+    """{module code: skeleton build function} of every module; entries are the structure JSON modules by code."""
+    function_names = module_function_names(plan)
+    furnish_names = furnish_function_names(plan)
+    doors = exterior_doors(plan, entries)
+    titles = {record.code: module_title(record) for record in plan.modules}
+    return {code: module_skeleton(plan, code, function_name, furnish_names.get(code), doors.get(code), titles)
+            for code, function_name in function_names.items()}
+
+
+def template_modules(plan, skeletons, furnishings):
+    """
+    {module code: furnish function followed by the skeleton that calls it}, for assemble_script.
+    A module without a furnish function gets an empty one, so the script still runs.
+    """
+    functions = {}
+    for code, skeleton in skeletons.items():
+        furnish_name = furnish_function_names(plan).get(code)
+        furnish = furnishings.get(code)
+        if furnish_name and not furnish:
+            furnish = f'def {furnish_name}(x, y, z):\n    """Not generated."""'
+        functions[code] = "\n\n\n".join(part for part in (furnish, skeleton) if part)
+    return functions
@@ -0,0 +1,234 @@
+import ast
+
+DIRECTIONS = {"north", "south", "east", "west", "up", "down"}
+MAIN_BLOCK = "<main block>"
+# The runtime library generated scripts import their utility functions and editor from.
+LIBRARY_MODULE = "runtime.building"
+
+
+def top_level_segments(tree: ast.Module):
+    """[(name, first line, last line)] of every top-level function plus the main block, 1-based and inclusive."""
+    segments = []
+    for node in tree.body:
+        if isinstance(node, ast.FunctionDef):
+            first = node.decorator_list[0].lineno if node.decorator_list else node.lineno
+            segments.append((node.name, first, node.end_lineno))
+        elif is_main_block(node):
+            segments.append((MAIN_BLOCK, node.lineno, node.end_lineno))
+    return segments
+
+
+def text_segments(code: str):
+    """Same as top_level_segments, from the raw lines, for code that does not parse."""
+    segments = []
+    lines = code.split("\n")
+    for number, line in enumerate(lines, 1):
+        if line and not line[0].isspace() and not line.startswith("#") and line[0] not in ")]}":
+            if segments and segments[-1][2] is None:
+                segments[-1] = (*segments[-1][:2], last_code_line(lines, number - 1))
+            if line.startswith("def "):
+                segments.append((line[4:].split("(")[0], number, None))
+            elif line.startswith("if __name__"):
+                segments.append((MAIN_BLOCK, number, None))
+    if segments and segments[-1][2] is None:
+        segments[-1] = (*segments[-1][:2], last_code_line(lines, len(lines)))
+    return segments
+
+
+def last_code_line(lines, number: int) -> int:
+    while number > 1 and not lines[number - 1].strip():
+        number -= 1
+    return number
+
+
+def segment_at(segments, line: int):
+    for segment in segments:
+        if segment[1] <= line <= segment[2]:
+            return segment
+    return None
+
+
+def is_main_block(node) -> bool:
+    return (isinstance(node, ast.If) and isinstance(node.test, ast.Compare)
+            and getattr(node.test.left, "id", "") == "__name__")
+
+
+def utility_functions(library_code: str):
+    """{name: FunctionDef} of the runtime library's utility functions."""
+    tree = ast.parse(library_code)
+    return {node.name: node for node in tree.body if isinstance(node, ast.FunctionDef)}
+
+
+def library_names(library_code: str):
+    """Every name a script can import from the runtime library: the utility functions and the editor."""
+    return {"editor", *utility_functions(library_code)}
+
+
+def library_imports(tree: ast.Module):
+    return [node for node in tree.body if isinstance(node, ast.ImportFrom) and node.module == LIBRARY_MODULE]
+
+
+def example_library_import(example_code: str) -> str:
+    """The SAMPLE CODE's import statements from the runtime library, which import every library name."""
+    lines = example_code.split("\n")
+    return "\n".join("\n".join(lines[node.lineno - 1:node.end_lineno]) for node in library_imports(ast.parse(example_code)))
+
+
+def is_dynamic_string(node) -> bool:
+    """f-strings, '+' concatenation and .format() calls, which prompts/code.txt forbids for block IDs and keys."""
+    if isinstance(node, ast.JoinedStr):
+        return True
+    if isinstance(node, ast.BinOp) and isinstance(node.op, (ast.Add, ast.Mod)):
+        return any((isinstance(side, ast.Constant) and isinstance(side.value, str)) or is_dynamic_string(side)
+                   for side in (node.left, node.right))
+    return isinstance(node, ast.Call) and isinstance(node.func, ast.Attribute) and node.func.attr == "format"
+
+
+def block_id_constants(tree: ast.Module, utilities):
+    """
+    Yield the ast.Constant of every string literal used as a block ID: the first argument of Block(...),
+    values of module-level material dicts, and string arguments to the utility functions.
+    """
+    for node in tree.body:
+        if isinstance(node, ast.Assign) and isinstance(node.value, ast.Dict):
+            for value in node.value.values:
+                if isinstance(value, ast.Constant) and isinstance(value.value, str):
+                    yield value
+
+    for node in ast.walk(tree):
+        if not isinstance(node, ast.Call):
+            continue
+        name = getattr(node.func, "id", None)
+        if name == "Block" and node.args and isinstance(node.args[0], ast.Constant) and isinstance(node.args[0].value, str):
+            yield node.args[0]
+        elif name in utilities:
+            for arg in [*node.args, *(keyword.value for keyword in node.keywords)]:
+                if isinstance(arg, ast.Constant) and isinstance(arg.value, str) and arg.value not in DIRECTIONS:
+                    yield arg
+
+
+def find_issues(code: str, library_code: str, block_index):
+    """
+    Check a generated build script before it is saved. Returns [issue], each a dict with kind, segment
+    (name, first line, last line) of the top-level function or main block it belongs to (None for the
+    whole module), line, message and, for unknown block IDs, the suggested replacement.
+    """
+    try:
+        tree = ast.parse(code)
+    except SyntaxError as e:
+        segments = text_segments(code)
+        return [{"kind": "syntax_error", "segment": segment_at(segments, e.lineno or 0), "line": e.lineno,
+                 "message": f"SyntaxError: {e.msg} (line {e.lineno})"}]
+
+    segments = top_level_segments(tree)
+    utilities = utility_functions(library_code)
+    names = library_names(library_code)
+    lines = code.split("\n")
+    issues = []
+
+    def add(kind, node, message, **extra):
+        issues.append({"kind": kind, "segment": segment_at(segments, node.lineno), "line": node.lineno,
+                       "source": lines[node.lineno - 1].strip(), "message": message, **extra})
+
+    # A copied utility or a second editor would shadow the library's, and its blocks would never be flushed.
+    for node in tree.body:
+        if isinstance(node, ast.FunctionDef) and node.name in names:
+            add("shadowed_library_name", node, f"Utility function '{node.name}' is redefined instead of imported "
+                                               f"from {LIBRARY_MODULE}.", name=node.name, last=node.end_lineno)
+        elif isinstance(node, ast.Assign) and any(getattr(target, "id", None) in names for target in node.targets):
+            name = next(target.id for target in node.targets if getattr(target, "id", None) in names)
+            add("shadowed_library_name", node, f"'{name}' is assigned instead of imported from {LIBRARY_MODULE}.",
+                name=name, last=node.end_lineno)
+
+    imported = {alias.asname or alias.name for node in library_imports(tree) for alias in node.names}
+    used = {node.id for node in ast.walk(tree) if isinstance(node, ast.Name) and node.id in names}
+    if "*" not in imported and used - imported:
+        issues.append({"kind": "missing_import", "segment": None, "line": None,
+                       "message": f"{', '.join(sorted(used - imported))} used without importing from {LIBRARY_MODULE}."})
+
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Call) and getattr(node.func, "id", None) == "Block" and node.args \
+                and (is_dynamic_string(node.args[0]) or isinstance(node.args[0], ast.BinOp)):
+            add("dynamic_block_id", node, "Block ID built with an f-string, '+' or .format(); "
+                                          "write the block ID as a static string.")
+        elif isinstance(node, ast.Subscript) and is_dynamic_string(node.slice):
+            add("dynamic_key", node, "Dictionary key built dynamically; use a static string key.")
+
+    for constant in block_id_constants(tree, utilities):
+        block_id = constant.value.removeprefix("minecraft:")
+        if block_id not in block_index.known:
+            suggestion = block_index.nearest(block_id)
+            hint = f" (did you mean '{suggestion}'?)" if suggestion else ""
+            add("unknown_block_id", constant, f"'{constant.value}' is not a Minecraft block ID{hint}.",
+                value=constant.value, suggestion=suggestion)
+
+    if not any(isinstance(node, ast.Attribute) and node.attr == "flushBuffer" for node in ast.walk(tree)):
+        main_block = next((segment for segment in segments if segment[0] == MAIN_BLOCK), None)
+        issues.append({"kind": "missing_flush", "segment": main_block, "line": main_block[1] if main_block else None,
+                       "message": "editor.flushBuffer() is never called, so nothing would be placed."})
+    return issues
+
+
+def splice(code: str, first: int, last: int, replacement: str) -> str:
+    """Replace lines first..last (1-based, inclusive) of code with replacement."""
+    lines = code.split("\n")
+    return "\n".join(lines[:first - 1] + replacement.strip("\n").split("\n") + lines[last:])
+
+
+def apply_local_fixes(code: str, issues, example_code: str):
+    """
+    Fix what needs no model: copied utility functions and editors are removed, the library import is
+    replaced by the SAMPLE CODE's (which imports every library name), and unknown block IDs with a close
+    valid ID are replaced by it. Returns (code, [descriptions of the fixes]).
+    """
+    fixes = []
+    replacements = {}
+    for issue in issues:
+        if issue["kind"] == "shadowed_library_name":
+            replacements[issue["line"]] = (issue["last"], "")
+            fixes.append(f"removed the copy of '{issue['name']}' (line {issue['line']}), it is imported instead")
+    fix_import = any(issue["kind"] in ("shadowed_library_name", "missing_import") for issue in issues)
+    if fix_import:
+        for node in library_imports(ast.parse(code)):
+            replacements[node.lineno] = (node.end_lineno, "")
+
+    # Block IDs are swapped inside their line; every other fix replaces whole statements, bottom-up.
+    lines = code.split("\n")
+    for issue in issues:
+        if issue["kind"] == "unknown_block_id" and issue.get("suggestion"):
+            original = issue["value"]
+            line = lines[issue["line"] - 1]
+            for quote in ('"', "'"):
+                line = line.replace(f"{quote}{original}{quote}", f"{quote}{issue['suggestion']}{quote}")
+            lines[issue["line"] - 1] = line
+            fixes.append(f"'{original}' -> '{issue['suggestion']}' (line {issue['line']})")
+    code = "\n".join(lines)
+    for first in sorted(replacements, reverse=True):
+        last, replacement = replacements[first]
+        code = splice(code, first, last, replacement)
+
+    if fix_import:
+        # Right after the script's own leading imports (gdpc), where the SAMPLE CODE has it.
+        tree = ast.parse(code)
+        after = 0
+        for node in tree.body:
+            if not isinstance(node, (ast.Import, ast.ImportFrom)):
+                break
+            after = node.end_lineno
+        lines = code.split("\n")
+        code = "\n".join(lines[:after] + [example_library_import(example_code)] + lines[after:])
+        fixes.append(f"imported every utility function and the editor from {LIBRARY_MODULE}")
+    return code, fixes
+
+
+def repair_targets(issues):
+    """{segment: [problem lines for the repair prompt]} of the issues only a model can fix, one entry per function (or main block)."""
+    targets = {}
+    for issue in issues:
+        if issue["kind"] in ("shadowed_library_name", "missing_import") or \
+                (issue["kind"] == "unknown_block_id" and issue.get("suggestion")):
+            continue
+        if issue["segment"]:
+            where = f"`{issue['source']}`: " if issue.get("source") else ""
+            targets.setdefault(tuple(issue["segment"]), []).append(f"- {where}{issue['message']}")
+    return targets
@@ -0,0 +1,71 @@
+import re
+
+EMPTY = "Φ"
+STAIR = "$"
+STAIR_TOP = "@"
+
+# Grid rows run north (top) to south (bottom), columns west (left) to east (right).
+DIRECTIONS = (
+    ("north", -1, 0),
+    ("south", 1, 0),
+    ("east", 0, 1),
+    ("west", 0, -1),
+)
+
+FLOOR_LABEL = re.compile(r"^(\d+)\s*F$", re.IGNORECASE)
+ROW_CELL = re.compile(r"[A-Z$@Φ]")
+
+
+def parse_layout(layout: str):
+    """
+    Parse the layout text produced by generate_layout into a list of floors, each a list of row strings.
+    Returns None if the text is not a clean rectangular grid (every floor the same shape).
+    """
+    floors = []
+    current = None
+    for raw_line in layout.splitlines():
+        line = raw_line.strip().strip("'`").replace("φ", EMPTY).replace(" ", "")
+        if not line:
+            continue
+        label = FLOOR_LABEL.match(line)
+        if label:
+            current = []
+            floors.append(current)
+            continue
+        if all(ROW_CELL.fullmatch(cell) for cell in line):
+            if current is None:
+                current = []
+                floors.append(current)
+            current.append(line)
+        elif current:
+            # Anything other than a heading after the grid started means the layout is not clean.
+            return None
+
+    floors = [floor for floor in floors if floor]
+    if not floors:
+        return None
+
+    rows, cols = len(floors[0]), len(floors[0][0])
+    for floor in floors:
+        if len(floor) != rows or any(len(row) != cols for row in floor):
+            return None
+    return floors
+
+
+def is_module(cell: str) -> bool:
+    return cell != EMPTY
+
+
+def module_sort_key(code: str):
+    """Letters first (alphabetical), then the stair module $, then the stair top @."""
+    return {STAIR: (1, code), STAIR_TOP: (2, code)}.get(code, (0, code))
+
+
+def neighbours(floor, row: int, col: int):
+    """Return [(direction, module_code)] for the non-empty cells orthogonally adjacent to (row, col)."""
+    found = []
+    for direction, d_row, d_col in DIRECTIONS:
+        r, c = row + d_row, col + d_col
+        if 0 <= r < len(floor) and 0 <= c < len(floor[r]) and is_module(floor[r][c]):
+            found.append((direction, floor[r][c]))
+    return found
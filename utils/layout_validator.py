@@ -0,0 +1,98 @@
+import re
+from dataclasses import dataclass
+from utils.layout_grid import EMPTY, STAIR, STAIR_TOP, parse_layout, is_module, neighbours
+
+MODULE_LINE = re.compile(r"^\W*([A-Z])\s*=", re.MULTILINE)
+
+
+@dataclass(frozen=True)
+class Violation:
+    """
+    One broken layout rule. floor, row and col are 0-based grid positions (rows north to south,
+    columns west to east), None where the rule is not about one cell.
+    """
+    rule: str
+    message: str
+    floor: int = None
+    row: int = None
+    col: int = None
+
+    def __str__(self):
+        if self.floor is None:
+            return self.message
+        if self.row is None:
+            return f"{self.floor + 1}F: {self.message}"
+        return f"{self.floor + 1}F row {self.row + 1} col {self.col + 1}: {self.message}"
+
+
+def listed_modules(modules: str):
+    """The room letters of a module list ("A = Master Bedroom, ..."); the special modules are not included."""
+    return set(MODULE_LINE.findall(modules or ""))
+
+
+def validate_layout(layout: str, modules: str = None):
+    """
+    Check a layout text against the hard rules of prompts/layout.txt and return every violation
+    (an empty list for a clean layout): a rectangular grid, unique room letters (and, given the module
+    list, exactly the listed rooms), no isolated or only diagonally connected modules, upper-floor
+    modules resting on lower ones, and one $ per floor below the top with the @ above them in one column.
+    """
+    floors = parse_layout(layout)
+    if floors is None:
+        return [Violation("grid", "the layout is not a rectangular grid of Φ, letters, $ and @ under floor headings")]
+
+    violations = []
+    cells = [(f, r, c, cell) for f, floor in enumerate(floors) for r, row in enumerate(floor)
+             for c, cell in enumerate(row) if is_module(cell)]
+    seen = set()
+    for f, r, c, cell in cells:
+        if cell in (STAIR, STAIR_TOP):
+            continue
+        if cell in seen:
+            violations.append(Violation("duplicate", f"{cell} is used more than once", f, r, c))
+        seen.add(cell)
+
+    listed = listed_modules(modules)
+    if listed:
+        violations += [Violation("unplaced", f"module {code} of the module list is not placed")
+                       for code in sorted(listed - seen)]
+        violations += [Violation("unlisted", f"{cell} is not in the module list", f, r, c)
+                       for f, r, c, cell in cells if cell not in (STAIR, STAIR_TOP) and cell not in listed]
+
+    for f, r, c, cell in cells:
+        floor = floors[f]
+        # $ and @ also connect vertically, so on a multi-floor layout they are never cut off.
+        if not neighbours(floor, r, c) and not (cell in (STAIR, STAIR_TOP) and len(floors) > 1):
+            diagonal = any(0 <= r + d_row < len(floor) and 0 <= c + d_col < len(floor[0])
+                           and is_module(floor[r + d_row][c + d_col]) for d_row in (-1, 1) for d_col in (-1, 1))
+            if diagonal:
+                violations.append(Violation("diagonal", f"{cell} only touches other modules diagonally", f, r, c))
+            else:
+                violations.append(Violation("isolated", f"{cell} is isolated", f, r, c))
+        if f > 0 and floors[f - 1][r][c] == EMPTY:
+            violations.append(Violation("unsupported", f"{cell} has no module below it", f, r, c))
+
+    violations += stair_violations(floors, cells)
+    return violations
+
+
+def stair_violations(floors, cells):
+    stairs = [(f, r, c, cell) for f, r, c, cell in cells if cell in (STAIR, STAIR_TOP)]
+    if len(floors) == 1:
+        return [Violation("stairs", f"a one-floor layout has no {cell}", f, r, c) for f, r, c, cell in stairs]
+
+    violations = []
+    top = len(floors) - 1
+    for f in range(len(floors)):
+        expected = STAIR_TOP if f == top else STAIR
+        count = sum(1 for floor, _, _, cell in stairs if floor == f and cell == expected)
+        if count != 1:
+            violations.append(Violation("stairs", f"needs exactly one {expected}, found {count}", f))
+        violations += [Violation("stairs", f"{cell} is not allowed on this floor (only {expected})", f, r, c)
+                       for floor, r, c, cell in stairs if floor == f and cell != expected]
+    if stairs:
+        _, row, col, _ = stairs[0]
+        violations += [Violation("stair_column", f"{cell} is not stacked above the {stairs[0][3]} of "
+                                                 f"{stairs[0][0] + 1}F row {row + 1} col {col + 1}", f, r, c)
+                       for f, r, c, cell in stairs[1:] if (r, c) != (row, col)]
+    return violations
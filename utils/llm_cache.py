@@ -0,0 +1,297 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from utils.rate_limit import get_rate_limiter, get_concurrency_limit
+from utils.tracing import LLM, span, set_attributes
+from utils.pricing import USAGE_KEYS, normalize_usage
+from utils.budget import reserve
+from utils.llm_pool import get_llm
+
+CACHE_ENABLED = os.getenv("LLM_CACHE", "1") != "0"
+CACHE_DIR = os.getenv("LLM_CACHE_DIR", "generated/cache")
+CACHE_MAX_BYTES = int(float(os.getenv("LLM_CACHE_MAX_MB", "500")) * 1024 * 1024)
+
+ZERO_USAGE = dict.fromkeys(USAGE_KEYS, 0)
+
+_evict_lock = threading.Lock()
+# Running size of the cache directory in bytes: measured on the first store, then kept up to date by
+# every store, so the directory is only walked again when it has grown past CACHE_MAX_BYTES.
+_cache_bytes = None
+
+
+def add_usage(usage: dict, extra: dict) -> dict:
+    """
+    Sum the token counts and costs of two usage dicts, e.g. a stage's main call and its follow-up calls.
+    """
+    return {key: usage.get(key, 0) + extra.get(key, 0) for key in ZERO_USAGE}
+
+
+def response_to_result(response):
+    """
+    Split a LangChain response into (content, usage_metadata).
+    """
+    content = response.content if hasattr(response, "content") else str(response)
+
+    usage = {}
+    if hasattr(response, "usage_metadata") and response.usage_metadata:
+        usage = response.usage_metadata
+    elif hasattr(response, "response_metadata"):
+        usage = response.response_metadata.get("usage_metadata", {})
+    return content, dict(usage)
+
+
+def render_prompt(prompt_input) -> str:
+    """
+    Text of a prompt (a string or a list of messages) without any attached images.
+    """
+    if isinstance(prompt_input, str):
+        return prompt_input
+
+    parts = []
+    for message in prompt_input:
+        content = message.content
+        if isinstance(content, str):
+            parts.append(content)
+        else:
+            parts.extend(part["text"] for part in content if part.get("type") == "text")
+    return "\n".join(parts)
+
+
+def file_hash(filepath) -> str:
+    if not filepath:
+        return ""
+    with open(filepath, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+def cache_key(model_name, temperature, prompt_text, image_path=None) -> str:
+    prompt_hash = hashlib.sha256(prompt_text.encode("utf-8")).hexdigest()
+    key_source = json.dumps([model_name, temperature, prompt_hash, file_hash(image_path)])
+    return hashlib.sha256(key_source.encode("utf-8")).hexdigest()
+
+
+def cache_path(key: str) -> str:
+    return os.path.join(CACHE_DIR, key[:2], f"{key}.json")
+
+
+def load_cached(key: str):
+    """
+    Return the cached entry for key, or None. A hit refreshes the entry's mtime, which is what LRU eviction uses.
+    """
+    path = cache_path(key)
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            entry = json.load(f)
+        os.utime(path)
+    except (OSError, json.JSONDecodeError):
+        return None
+    return entry
+
+
+def store_cached(key: str, entry: dict) -> None:
+    global _cache_bytes
+    path = cache_path(key)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.{threading.get_ident()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(entry, f, ensure_ascii=False)
+    size = os.path.getsize(tmp_path)
+    replaced = os.path.getsize(path) if os.path.exists(path) else 0
+    os.replace(tmp_path, path)
+    with _evict_lock:
+        if _cache_bytes is None:
+            _cache_bytes = cache_size()
+        else:
+            _cache_bytes += size - replaced
+        full = _cache_bytes > CACHE_MAX_BYTES
+    if full:
+        evict_cache()
+
+
+def cache_size() -> int:
+    return sum(os.path.getsize(os.path.join(root, name))
+               for root, _, files in os.walk(CACHE_DIR) for name in files if name.endswith(".json"))
+
+
+def evict_cache(max_bytes: int = CACHE_MAX_BYTES) -> None:
+    """
+    Delete the least recently used entries until the cache fits in max_bytes.
+    """
+    global _cache_bytes
+    with _evict_lock:
+        entries = []
+        for root, _, files in os.walk(CACHE_DIR):
+            for name in files:
+                if name.endswith(".json"):
+                    path = os.path.join(root, name)
+                    stat = os.stat(path)
+                    entries.append((stat.st_mtime, stat.st_size, path))
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= max_bytes:
+                break
+            os.remove(path)
+            total -= size
+        _cache_bytes = total
+
+
+def lookup_response(llm, prompt_input, image_path=None, refresh=False, variant=0):
+    """
+    Return (model_name, cache key, cached (content, usage) or None) for a request about to be sent to llm.
+    refresh skips the lookup (the new response still replaces the cached one), for deliberate regeneration.
+    variant > 0 keys one of several independent answers to the same prompt, e.g. layout candidates.
+    """
+    model_name = getattr(llm, "model", "")
+    temperature = getattr(llm, "temperature", None)
+    prompt_text = render_prompt(prompt_input) + (f"\n#variant {variant}" if variant else "")
+    key = cache_key(model_name, temperature, prompt_text, image_path)
+
+    if CACHE_ENABLED and not refresh:
+        entry = load_cached(key)
+        if entry is not None:
+            print(f"[Cache] Hit for {model_name} ({key[:12]})")
+            return model_name, key, (entry["content"], dict(ZERO_USAGE))
+    return model_name, key, None
+
+
+def remember_response(llm, key, response, reservation):
+    """
+    (content, usage) of a response, with the usage normalized and priced (utils/pricing.py);
+    the request's real cost replaces its reservation in the budgets.
+    """
+    content, usage = response_to_result(response)
+    usage = normalize_usage(getattr(llm, "model", ""), usage)
+    reservation.settle(usage["cost"])
+    set_attributes(**usage)
+    if CACHE_ENABLED:
+        store_cached(key, {
+            "model": getattr(llm, "model", ""),
+            "temperature": getattr(llm, "temperature", None),
+            "content": content,
+            "usage_metadata": usage,
+        })
+    return content, usage
+
+
+def llm_span(llm):
+    """Span of one model request; its queue_time is the wait for the rate limiter and a concurrency slot."""
+    return span(f"LLM {getattr(llm, 'model', '')}", LLM, model=getattr(llm, "model", ""))
+
+
+def prepare_request(llm, prompt_input, image_path, refresh, call, variant=0):
+    """
+    Cache lookup and budget check of one request; returns (llm, model_name, key, cached, reservation).
+    A request the budgets cannot afford raises BudgetExceeded or, with BUDGET_ACTION=downgrade,
+    goes to the cheaper model (looked up in the cache again under that model).
+    """
+    model_name, key, cached = lookup_response(llm, prompt_input, image_path, refresh, variant)
+    reservation = None
+    if cached is None:
+        model, reservation = reserve(model_name, render_prompt(prompt_input))
+        if model != model_name:
+            llm = get_llm(model, getattr(llm, "temperature", None))
+            call.name = f"LLM {model}"
+            call.attrs.update(model=model, downgraded_from=model_name)
+            model_name, key, cached = lookup_response(llm, prompt_input, image_path, refresh, variant)
+            if cached:
+                reservation.settle(0.0)
+    call.attrs["cache_hit"] = cached is not None
+    return llm, model_name, key, cached, reservation
+
+
+def invoke_cached(llm, prompt_input, image_path=None, refresh=False, variant=0):
+    """
+    llm.invoke(prompt_input) memoized on disk by model name, temperature, rendered prompt and image.
+    Returns (content, usage); cache hits report zero usage since nothing was paid for them.
+    """
+    with llm_span(llm) as call:
+        llm, model_name, key, cached, reservation = prepare_request(llm, prompt_input, image_path, refresh, call, variant)
+        if cached:
+            return cached
+
+        with reservation:
+            queued = time.perf_counter()
+            get_rate_limiter(model_name).acquire()
+            with get_concurrency_limit(model_name):
+                call.attrs["queue_time"] = time.perf_counter() - queued
+                response = llm.invoke(prompt_input)
+            return remember_response(llm, key, response, reservation)
+
+
+async def ainvoke_cached(llm, prompt_input, image_path=None, refresh=False, variant=0):
+    """
+    Async counterpart of invoke_cached built on llm.ainvoke.
+    """
+    with llm_span(llm) as call:
+        llm, model_name, key, cached, reservation = prepare_request(llm, prompt_input, image_path, refresh, call, variant)
+        if cached:
+            return cached
+
+        with reservation:
+            queued = time.perf_counter()
+            await get_rate_limiter(model_name).aacquire()
+            async with get_concurrency_limit(model_name):
+                call.attrs["queue_time"] = time.perf_counter() - queued
+                response = await llm.ainvoke(prompt_input)
+            return remember_response(llm, key, response, reservation)
+
+
+def chunk_text(chunk) -> str:
+    content = chunk.content if hasattr(chunk, "content") else str(chunk)
+    if isinstance(content, list):
+        return "".join(part.get("text", "") if isinstance(part, dict) else str(part) for part in content)
+    return content
+
+
+def stream_cached(llm, prompt_input, on_text, image_path=None):
+    """
+    Like invoke_cached, but streams with llm.stream and calls on_text(piece) for every piece of text
+    as it arrives. A cache hit is delivered as a single piece. The span records the time to first token.
+    """
+    with llm_span(llm) as call:
+        llm, model_name, key, cached, reservation = prepare_request(llm, prompt_input, image_path, False, call)
+        if cached:
+            on_text(cached[0])
+            return cached
+
+        with reservation:
+            queued = time.perf_counter()
+            get_rate_limiter(model_name).acquire()
+            response = None
+            with get_concurrency_limit(model_name):
+                sent = time.perf_counter()
+                call.attrs["queue_time"] = sent - queued
+                for chunk in llm.stream(prompt_input):
+                    if response is None:
+                        call.attrs["time_to_first_token"] = time.perf_counter() - sent
+                    response = chunk if response is None else response + chunk
+                    on_text(chunk_text(chunk))
+            return remember_response(llm, key, response, reservation)
+
+
+async def astream_cached(llm, prompt_input, on_text, image_path=None):
+    """
+    Async counterpart of stream_cached built on llm.astream.
+    """
+    with llm_span(llm) as call:
+        llm, model_name, key, cached, reservation = prepare_request(llm, prompt_input, image_path, False, call)
+        if cached:
+            on_text(cached[0])
+            return cached
+
+        with reservation:
+            queued = time.perf_counter()
+            await get_rate_limiter(model_name).aacquire()
+            response = None
+            async with get_concurrency_limit(model_name):
+                sent = time.perf_counter()
+                call.attrs["queue_time"] = sent - queued
+                async for chunk in llm.astream(prompt_input):
+                    if response is None:
+                        call.attrs["time_to_first_token"] = time.perf_counter() - sent
+                    response = chunk if response is None else response + chunk
+                    on_text(chunk_text(chunk))
+            return remember_response(llm, key, response, reservation)
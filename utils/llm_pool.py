@@ -0,0 +1,23 @@
+import os
+import threading
+from langchain_google_genai import ChatGoogleGenerativeAI
+
+# Transport of the Gemini clients ("rest" or "grpc"); unset keeps the library's default.
+LLM_TRANSPORT = os.getenv("LLM_TRANSPORT", "")
+
+_clients = {}
+_clients_lock = threading.Lock()
+
+
+def get_llm(model_name: str, temperature: float):
+    """
+    The shared chat client for (model, temperature). Every stage asking for the same pair borrows the
+    same client, so its connections stay open and are reused across stages, threads and buildings.
+    Concurrent requests are capped in utils/rate_limit.py (LLM_MAX_CONCURRENCY, LLM_CONCURRENCY_LIMITS).
+    """
+    key = ((model_name or "").removeprefix("models/"), float(temperature))
+    with _clients_lock:
+        if key not in _clients:
+            options = {"transport": LLM_TRANSPORT} if LLM_TRANSPORT else {}
+            _clients[key] = ChatGoogleGenerativeAI(model=model_name, temperature=temperature, **options)
+        return _clients[key]
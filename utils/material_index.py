@@ -0,0 +1,222 @@
+import re
+
+# Words a user or style description uses, mapped to block-ID tokens they imply.
+CATEGORY_KEYWORDS = {
+    "wood": ["oak", "spruce", "birch", "dark_oak"],
+    "wooden": ["oak", "spruce", "birch", "dark_oak"],
+    "timber": ["oak", "spruce", "dark_oak"],
+    "log": ["oak", "spruce", "dark_oak"],
+    "cabin": ["spruce", "oak", "cobblestone"],
+    "cottage": ["oak", "spruce", "cobblestone", "wool"],
+    "stone": ["stone", "cobblestone", "stone_brick", "andesite", "polished_andesite"],
+    "castle": ["stone_brick", "cobblestone", "deepslate_brick", "iron_bars"],
+    "medieval": ["cobblestone", "stone_brick", "spruce", "dark_oak"],
+    "brick": ["brick", "bricks"],
+    "wool": ["wool", "carpet"],
+    "woolen": ["wool", "carpet"],
+    "glass": ["glass", "glass_pane", "stained_glass"],
+    "modern": ["white_concrete", "gray_concrete", "quartz", "smooth_quartz", "glass", "light_gray_stained_glass"],
+    "minimalist": ["white_concrete", "quartz", "smooth_quartz", "glass"],
+    "concrete": ["concrete"],
+    "desert": ["sandstone", "smooth_sandstone", "cut_sandstone", "terracotta"],
+    "sand": ["sandstone", "smooth_sandstone"],
+    "japanese": ["cherry", "bamboo", "spruce", "paper"],
+    "oriental": ["cherry", "bamboo", "dark_oak"],
+    "snow": ["snow", "packed_ice", "spruce"],
+    "ice": ["ice", "packed_ice", "blue_ice"],
+    "nether": ["nether_brick", "blackstone", "crimson", "warped", "basalt"],
+    "dark": ["dark_oak", "deepslate", "blackstone"],
+    "gothic": ["deepslate", "blackstone", "dark_oak", "stained_glass"],
+    "luxury": ["quartz", "smooth_quartz", "gold_block", "polished_diorite"],
+    "marble": ["quartz", "calcite", "polished_diorite"],
+    "copper": ["copper"],
+    "garden": ["flower_pot", "azalea", "grass_block", "leaves"],
+    "pool": ["water", "prismarine", "sea_lantern"],
+}
+
+# Furniture, lighting and structural blocks every building may need, whatever its style.
+CORE_MATERIALS = [
+    "air", "water", "glass", "glass_pane", "lantern", "soul_lantern", "torch", "wall_torch", "sea_lantern",
+    "end_rod", "candle", "chain", "iron_bars", "ladder", "chest", "barrel", "bookshelf", "crafting_table",
+    "furnace", "smoker", "blast_furnace", "cauldron", "lectern", "loom", "flower_pot", "white_bed", "red_bed",
+    "white_carpet", "red_carpet", "light_gray_stained_glass_pane", "oak_door", "oak_trapdoor", "anvil",
+    "campfire", "jukebox", "note_block", "brewing_stand", "composter",
+]
+
+# Technical or natural blocks that are never building material.
+EXCLUDED_PATTERNS = re.compile(
+    r"(_ore$|command_block|^jigsaw$|^barrier$|^structure_|moving_piston|bubble_column|portal|^fire$|"
+    r"^cave_air$|^void_air$|^infested_|^attached_|_stem$|_wall_sign$|_wall_hanging_sign$|_wall_banner$|"
+    r"_wall_head$|_wall_fan$|candle_cake$|^potted_|^light$|^frogspawn$|^piston_head$|_cauldron$)"
+)
+
+DEFAULT_FAMILIES = ["oak", "spruce", "dark_oak", "stone_brick", "cobblestone", "white_wool", "smooth_quartz"]
+
+BLOCK_ID_PATTERN = re.compile(r"\b[a-z]+(?:_[a-z]+)+\b")
+
+
+def build_token_index(material_ids):
+    """
+    Map every token of every block ID (and every '_'-joined run of tokens, e.g. 'dark_oak') to the IDs containing it.
+    """
+    index = {}
+    for material_id in material_ids:
+        tokens = material_id.split("_")
+        for start in range(len(tokens)):
+            for end in range(start + 1, len(tokens) + 1):
+                index.setdefault("_".join(tokens[start:end]), set()).add(material_id)
+    return index
+
+
+def family_members(family, index):
+    """IDs that start with the family name, e.g. 'spruce' -> spruce_planks, spruce_stairs, spruce_door..."""
+    return {m for m in index.get(family, ()) if m == family or m.startswith(family + "_")}
+
+
+def select_materials(text, material_ids, limit=200):
+    """
+    Pick the block IDs relevant to a description: IDs it names verbatim (with their family), IDs matching its
+    words or style keywords, plus CORE_MATERIALS. Returns them in material-list order, at most `limit`.
+    """
+    index = build_token_index(material_ids)
+    known = set(material_ids)
+    text = (text or "").lower()
+    scores = {}
+
+    def add(ids, score):
+        for material_id in ids:
+            if not EXCLUDED_PATTERNS.search(material_id):
+                scores[material_id] = max(scores.get(material_id, 0), score)
+
+    # Block IDs written out in the text, e.g. "dark_oak_log", pull in their whole family.
+    for mentioned in BLOCK_ID_PATTERN.findall(text):
+        if mentioned in known:
+            add([mentioned], 4)
+            tokens = mentioned.split("_")
+            add(family_members("_".join(tokens[:-1]) if len(tokens) > 1 else mentioned, index), 3)
+
+    words = re.findall(r"[a-z]+", text)
+    for word in words:
+        for family in CATEGORY_KEYWORDS.get(word, []):
+            add(family_members(family, index) or index.get(family, ()), 2)
+        # A plain word only selects the family it starts, e.g. "birch" or "white", never every "*_wall".
+        singular = word[:-1] if word.endswith("s") else word
+        for token in {word, singular}:
+            if len(token) > 2:
+                add(family_members(token, index), 2)
+
+    if len(scores) < 20:
+        for family in DEFAULT_FAMILIES:
+            add(family_members(family, index), 1)
+    add([m for m in CORE_MATERIALS if m in known], 1)
+
+    ranked = sorted(scores, key=lambda m: -scores[m])[:limit]
+    chosen = set(ranked)
+    return [m for m in material_ids if m in chosen]
+
+
+# Words that describe how a material is used rather than which block it is.
+FILLER_WORDS = {
+    "accent", "accents", "panel", "panels", "frame", "framed", "framing", "trim", "details", "detail", "beams",
+    "beam", "pillars", "pillar", "border", "borders", "inlay", "inlays", "walls", "wall_panels", "a", "the", "of",
+    "for", "in", "on", "made", "style", "design", "mix", "mixed", "pattern", "patterned", "highlights",
+}
+
+MATERIAL_SEPARATORS = re.compile(r"\s*(?:,|/|;|&|\+|\band\b|\bwith\b|\bor\b|\bplus\b)\s*")
+
+# Structure JSON fields whose value is a list of materials (rather than free text).
+MATERIAL_FIELDS = {"foundation", "frame", "walls", "windows", "roof", "flooring", "ceiling", "material", "floor"}
+
+
+def trigrams(word: str):
+    padded = f"^{word}$"
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class BlockIdIndex:
+    """
+    Precomputed trigram index over the valid block IDs, for fast exact lookups and nearest-ID correction.
+    """
+
+    def __init__(self, material_ids, min_similarity=0.55):
+        self.ids = list(material_ids)
+        self.known = set(self.ids)
+        self.min_similarity = min_similarity
+        self.grams = {}
+        self.postings = {}
+        for material_id in self.ids:
+            grams = trigrams(material_id)
+            self.grams[material_id] = grams
+            for gram in grams:
+                self.postings.setdefault(gram, []).append(material_id)
+        self.corrections = {}
+
+    def nearest(self, word: str):
+        """
+        The valid ID with the highest trigram (Dice) similarity to word, or None below min_similarity.
+        """
+        if word in self.known:
+            return word
+        if word in self.corrections:
+            return self.corrections[word]
+
+        grams = trigrams(word)
+        shared = {}
+        for gram in grams:
+            for material_id in self.postings.get(gram, ()):
+                shared[material_id] = shared.get(material_id, 0) + 1
+
+        best, best_score = None, self.min_similarity
+        for material_id, count in shared.items():
+            score = 2 * count / (len(grams) + len(self.grams[material_id]))
+            if score > best_score or (score == best_score and best and len(material_id) < len(best)):
+                best, best_score = material_id, score
+        self.corrections[word] = best
+        return best
+
+    def correct_text(self, text: str):
+        """
+        Replace every snake_case word of free text that is not a valid ID with the nearest valid ID.
+        """
+        return BLOCK_ID_PATTERN.sub(lambda match: self.nearest(match.group(0)) or match.group(0), text)
+
+    def split_materials(self, value: str):
+        """
+        Split a material description into valid IDs:
+        'white_wool with light_gray_wool accents' -> ['white_wool', 'light_gray_wool'].
+        """
+        found = []
+        for part in MATERIAL_SEPARATORS.split(value.lower()):
+            candidates = BLOCK_ID_PATTERN.findall(part)
+            if not candidates:
+                words = [w for w in re.findall(r"[a-z_]+", part) if w not in FILLER_WORDS]
+                candidates = ["_".join(words)] if words else []
+            for candidate in candidates:
+                material_id = self.nearest(candidate)
+                if material_id and material_id not in found:
+                    found.append(material_id)
+        return found
+
+
+def correct_structure_materials(data, index: BlockIdIndex, corrections=None, field=None):
+    """
+    Walk the structure JSON: material fields become comma-separated valid IDs, block IDs inside
+    free-text fields are corrected in place. corrections collects {original value: corrected value}.
+    """
+    if corrections is None:
+        corrections = {}
+    if isinstance(data, dict):
+        return {key: correct_structure_materials(value, index, corrections, key) for key, value in data.items()}
+    if isinstance(data, list):
+        return [correct_structure_materials(value, index, corrections, field) for value in data]
+    if not isinstance(data, str):
+        return data
+
+    if field in MATERIAL_FIELDS:
+        materials = index.split_materials(data)
+        corrected = ", ".join(materials) if materials else data
+    else:
+        corrected = index.correct_text(data)
+    if corrected != data:
+        corrections[data] = corrected
+    return corrected
@@ -0,0 +1,77 @@
+import os
+from dotenv import load_dotenv
+from utils.llm_pool import get_llm
+from utils.llm_cache import invoke_cached, ainvoke_cached, add_usage
+from utils.tracing import add_retry, set_attributes
+
+load_dotenv()
+MODEL_NAME = os.getenv("MODEL_NAME", "gemini-2.5-pro")
+FLASH_MODEL = "gemini-2.5-flash"
+# STAGE_MODELS=tiered: the structural stages, whose output is checked locally, run on a flash-tier model;
+# the style (which may read an image) and the code stay on MODEL_NAME.
+TIERED_MODELS = {
+    "modules": FLASH_MODEL,
+    "furniture": FLASH_MODEL,
+    "layout": FLASH_MODEL,
+    "connections": FLASH_MODEL,
+    "structure_json": FLASH_MODEL,
+}
+# Model per chain, e.g. STAGE_MODELS="layout=gemini-2.5-flash,modules=gemini-2.5-flash-lite" (chain names:
+# style, modules, furniture, layout, connections, structure_json, code), or "tiered"; others use MODEL_NAME.
+_stage_models = os.getenv("STAGE_MODELS", "")
+STAGE_MODELS = dict(TIERED_MODELS) if _stage_models.strip() == "tiered" else {
+    name.strip(): model.strip()
+    for name, model in (item.split("=", 1) for item in _stage_models.split(",") if "=" in item)
+}
+# Output of a routed model that fails its stage's local validation is requested again from this model
+# (default MODEL_NAME); ESCALATION_MODEL=none turns escalation off.
+ESCALATION_MODEL = os.getenv("ESCALATION_MODEL", MODEL_NAME)
+
+
+def stage_model(stage: str) -> str:
+    return STAGE_MODELS.get(stage, MODEL_NAME)
+
+
+def model_of(llm) -> str:
+    return (getattr(llm, "model", "") or "").removeprefix("models/")
+
+
+def escalation_llm(llm):
+    """The stronger client to retry llm's failed output with, or None if llm already is that model."""
+    if not ESCALATION_MODEL or ESCALATION_MODEL == "none" or model_of(llm) == ESCALATION_MODEL:
+        return None
+    return get_llm(ESCALATION_MODEL, getattr(llm, "temperature", None))
+
+
+def escalate(llm, label: str):
+    """The escalation client for output of llm that failed validation (logged on the stage span), or None."""
+    stronger = escalation_llm(llm)
+    if stronger is not None:
+        print(f"Warning: [{label}] {model_of(llm)} output failed validation, asking {model_of(stronger)}.")
+        add_retry()
+        set_attributes(escalated_to=model_of(stronger))
+    return stronger
+
+
+def invoke_checked(llm, prompt_input, is_valid, label: str, image_path=None):
+    """
+    invoke_cached, then the same prompt once more on the escalation model when is_valid(content) fails.
+    Returns the content that was kept and the usage of both requests.
+    """
+    content, usage = invoke_cached(llm, prompt_input, image_path)
+    if not is_valid(content):
+        stronger = escalate(llm, label)
+        if stronger is not None:
+            content, extra = invoke_cached(stronger, prompt_input, image_path)
+            usage = add_usage(usage, extra)
+    return content, usage
+
+
+async def ainvoke_checked(llm, prompt_input, is_valid, label: str, image_path=None):
+    content, usage = await ainvoke_cached(llm, prompt_input, image_path)
+    if not is_valid(content):
+        stronger = escalate(llm, label)
+        if stronger is not None:
+            content, extra = await ainvoke_cached(stronger, prompt_input, image_path)
+            usage = add_usage(usage, extra)
+    return content, usage
@@ -0,0 +1,177 @@
+import asyncio
+from functools import partial
+from dataclasses import dataclass
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from utils.tracing import STAGE, span, run_in_context, add_retry
+from utils.pricing import USAGE_KEYS
+from utils.llm_cache import add_usage
+from utils.budget import budget_scope, stage_budget
+
+
+@dataclass(frozen=True)
+class Stage:
+    """
+    One step of the generation pipeline: the chain function to call (and its coroutine counterpart),
+    the context keys passed to it (in argument order), the context key its content is stored under
+    and the note used in the log file.
+    """
+    name: str
+    func: callable
+    inputs: tuple
+    output: str
+    note: str
+    afunc: callable = None
+    # Optional local check of the stage's content, check(content, *inputs) -> list of problems. While it finds
+    # problems the stage is run again, up to `retries` times, with func(*inputs, feedback=(content, problems)).
+    check: callable = None
+    retries: int = 0
+
+
+def record_usage(stage_span, usage) -> None:
+    stage_span.attrs.update({key: usage.get(key, 0) for key in USAGE_KEYS})
+
+
+def stage_problems(name, check, content, args, retry: bool):
+    """The check's problems with the stage's content, printed; retry says whether the stage runs again."""
+    problems = check(content, *args) if check else []
+    if problems:
+        print(f"[{name}] {len(problems)} problems found" + (", retrying:" if retry else ", continuing with them:"))
+        for problem in problems:
+            print(f"  - {problem}")
+        if retry:
+            add_retry()
+    return problems
+
+
+def run_task_with_timing(name, func, *args, check=None, retries=0):
+    """
+    Run one stage inside a stage span (its LLM calls and parse steps nest under it) and the stage's budget,
+    retrying it with feedback while check reports problems; returns ((content, usage), duration).
+    """
+    with span(name, STAGE) as stage_span, budget_scope(f"'{name}' stage", stage_budget(name)):
+        content, usage = func(*args)
+        for attempt in range(retries + 1 if check else 0):
+            problems = stage_problems(name, check, content, args, attempt < retries)
+            if not problems or attempt == retries:
+                break
+            content, retry_usage = func(*args, feedback=(content, problems))
+            usage = add_usage(usage, retry_usage)
+        record_usage(stage_span, usage)
+    return (content, usage), stage_span.duration
+
+
+async def arun_task_with_timing(name, afunc, *args, check=None, retries=0):
+    with span(name, STAGE) as stage_span, budget_scope(f"'{name}' stage", stage_budget(name)):
+        content, usage = await afunc(*args)
+        for attempt in range(retries + 1 if check else 0):
+            problems = stage_problems(name, check, content, args, attempt < retries)
+            if not problems or attempt == retries:
+                break
+            content, retry_usage = await afunc(*args, feedback=(content, problems))
+            usage = add_usage(usage, retry_usage)
+        record_usage(stage_span, usage)
+    return (content, usage), stage_span.duration
+
+
+def check_stages(stages, context):
+    """
+    Make sure every stage input is either already in the context or produced by exactly one stage.
+    """
+    producers = {}
+    for stage in stages:
+        if stage.output in producers:
+            raise ValueError(f"[ERROR] Stages '{producers[stage.output]}' and '{stage.name}' both produce '{stage.output}'")
+        producers[stage.output] = stage.name
+
+    for stage in stages:
+        for key in stage.inputs:
+            if key not in context and key not in producers:
+                raise ValueError(f"[ERROR] Stage '{stage.name}' needs '{key}', which nothing provides")
+
+
+def finish_stage(stage, future, context, on_complete, error, still_running: int):
+    """
+    Store a finished stage's content and pass it to on_complete; returns the run's first error
+    (error, or this stage's exception if it failed first).
+    """
+    try:
+        (content, usage), duration = future.result()
+    except Exception as e:
+        if error is None and still_running:
+            print(f"[{stage.name}] failed; finishing the {still_running} running stages before stopping.")
+        return error or e
+    context[stage.output] = content
+    if on_complete:
+        on_complete(stage, content, usage, duration)
+    return error
+
+
+def run_stages(stages, context, on_complete=None, max_workers=None):
+    """
+    Run the stage graph, starting each stage as soon as all of its inputs are in the context.
+    Stages whose output is already in the context are skipped.
+    on_complete(stage, content, usage, duration) is called from the calling thread as each stage finishes.
+    When a stage fails no new stage starts, the ones already running are finished (and passed to on_complete,
+    so their paid output is checkpointed) and then the first error is raised.
+    """
+    check_stages(stages, context)
+    pending = [stage for stage in stages if stage.output not in context]
+    running = {}
+    error = None
+
+    with ThreadPoolExecutor(max_workers=max_workers or max(len(pending), 1)) as executor:
+        while (pending and error is None) or running:
+            for stage in [s for s in pending if error is None and all(key in context for key in s.inputs)]:
+                pending.remove(stage)
+                args = [context[key] for key in stage.inputs]
+                print(f">>> Starting {stage.name}...")
+                running[run_in_context(executor, partial(run_task_with_timing, check=stage.check, retries=stage.retries),
+                                       stage.name, stage.func, *args)] = stage
+
+            if not running:
+                names = ", ".join(stage.name for stage in pending)
+                raise RuntimeError(f"[ERROR] Stages can never start (circular inputs): {names}")
+
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                error = finish_stage(running.pop(future), future, context, on_complete, error, len(running))
+
+    if error is not None:
+        raise error
+    return context
+
+
+async def arun_stages(stages, context, on_complete=None):
+    """
+    Async counterpart of run_stages: every stage runs its afunc as a task on the current event loop,
+    so many buildings can share one thread. A failed stage is handled as in run_stages.
+    """
+    check_stages(stages, context)
+    pending = [stage for stage in stages if stage.output not in context]
+    running = {}
+    error = None
+
+    try:
+        while (pending and error is None) or running:
+            for stage in [s for s in pending if error is None and all(key in context for key in s.inputs)]:
+                pending.remove(stage)
+                args = [context[key] for key in stage.inputs]
+                print(f">>> Starting {stage.name}...")
+                running[asyncio.create_task(arun_task_with_timing(stage.name, stage.afunc, *args,
+                                                                  check=stage.check, retries=stage.retries))] = stage
+
+            if not running:
+                names = ", ".join(stage.name for stage in pending)
+                raise RuntimeError(f"[ERROR] Stages can never start (circular inputs): {names}")
+
+            done, _ = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                error = finish_stage(running.pop(task), task, context, on_complete, error, len(running))
+    finally:
+        # Only reached with stages still running when the run itself is cancelled.
+        for task in running:
+            task.cancel()
+
+    if error is not None:
+        raise error
+    return context
@@ -0,0 +1,256 @@
+import json
+import re
+from dataclasses import dataclass, field
+from utils.layout_grid import EMPTY, DIRECTIONS, FLOOR_LABEL, parse_layout, module_sort_key
+
+PLAN_FORMAT_VERSION = 1
+UNKNOWN = -1
+
+# Block-ID-like words inside structure JSON values.
+MATERIAL_SPLIT = re.compile(r"[a-z]+(?:_[a-z]+)*")
+
+
+@dataclass(slots=True)
+class MaterialTable:
+    """
+    Block IDs interned as integers. IDs loaded from materials.txt come first; anything else the
+    model invents is appended after known_count, so it can still be referenced and reported.
+    """
+    ids: list = field(default_factory=list)
+    index: dict = field(default_factory=dict)
+    known_count: int = 0
+
+    @classmethod
+    def from_ids(cls, material_ids):
+        table = cls()
+        for material_id in material_ids:
+            table.intern(material_id)
+        table.known_count = len(table.ids)
+        return table
+
+    def intern(self, material_id: str) -> int:
+        material_id = material_id.strip().lower()
+        if material_id not in self.index:
+            self.index[material_id] = len(self.ids)
+            self.ids.append(material_id)
+        return self.index[material_id]
+
+    def copy(self):
+        """A table with the same IDs that can grow without changing this one."""
+        return MaterialTable(list(self.ids), dict(self.index), self.known_count)
+
+    def is_known(self, material: int) -> bool:
+        return 0 <= material < self.known_count
+
+    def name(self, material: int) -> str:
+        return self.ids[material] if material >= 0 else ""
+
+
+@dataclass(slots=True)
+class FloorGrid:
+    """
+    All floors of the layout in one bytearray, indexed [(floor * rows + row) * cols + col].
+    Each cell holds an index into codes; 0 is the empty module Φ.
+    """
+    floors: int
+    rows: int
+    cols: int
+    codes: list
+    cells: bytearray
+
+    @classmethod
+    def from_floors(cls, floors):
+        codes = [EMPTY]
+        lookup = {EMPTY: 0}
+        cells = bytearray()
+        for floor in floors:
+            for row in floor:
+                for code in row:
+                    if code not in lookup:
+                        lookup[code] = len(codes)
+                        codes.append(code)
+                    cells.append(lookup[code])
+        return cls(len(floors), len(floors[0]), len(floors[0][0]), codes, cells)
+
+    def at(self, floor: int, row: int, col: int) -> str:
+        if 0 <= floor < self.floors and 0 <= row < self.rows and 0 <= col < self.cols:
+            return self.codes[self.cells[(floor * self.rows + row) * self.cols + col]]
+        return EMPTY
+
+    def positions(self):
+        """Yield (code, floor, row, col) for every non-empty cell, floor by floor."""
+        for i, value in enumerate(self.cells):
+            if value:
+                floor, rest = divmod(i, self.rows * self.cols)
+                yield (self.codes[value], floor, *divmod(rest, self.cols))
+
+    def neighbours(self, floor: int, row: int, col: int):
+        """[(direction, code)] of the non-empty cells orthogonally adjacent on the same floor."""
+        found = []
+        for direction, d_row, d_col in DIRECTIONS:
+            code = self.at(floor, row + d_row, col + d_col)
+            if code != EMPTY:
+                found.append((direction, code))
+        return found
+
+    def floor_rows(self, floor: int):
+        return ["".join(self.at(floor, row, col) for col in range(self.cols)) for row in range(self.rows)]
+
+
+@dataclass(slots=True)
+class ModuleRecord:
+    code: str
+    floor: int
+    row: int
+    col: int
+    name: str = ""
+    foundation: tuple = ()
+    walls: tuple = ()
+    ceiling: tuple = ()
+    roof: tuple = ()
+    furniture: tuple = ()
+    links: tuple = ()
+    top_floor: bool = False
+
+
+@dataclass(slots=True)
+class BuildingPlan:
+    """
+    The building as parsed once from the stage outputs: layout grid, one record per module cell
+    (a stair module spanning several floors has one record per floor) and the material table
+    the records' integer material references point into.
+    """
+    grid: FloorGrid
+    modules: list
+    materials: MaterialTable
+
+    def module(self, code: str, floor: int = None):
+        for record in self.modules:
+            if record.code == code and (floor is None or record.floor == floor):
+                return record
+        return None
+
+    def floor_modules(self, floor: int):
+        return sorted((m for m in self.modules if m.floor == floor), key=lambda m: module_sort_key(m.code))
+
+    def to_compact(self) -> str:
+        """
+        Compact JSON: the grid as a string of codes, and per module only integers into a plan-local
+        material list, so the plan can be checkpointed and passed between stages cheaply.
+        """
+        used = sorted({m for record in self.modules
+                       for m in (*record.foundation, *record.walls, *record.ceiling, *record.roof, *record.furniture)})
+        local = {m: i for i, m in enumerate(used)}
+
+        def pack(materials):
+            return [local[m] for m in materials]
+
+        return json.dumps({
+            "v": PLAN_FORMAT_VERSION,
+            "size": [self.grid.floors, self.grid.rows, self.grid.cols],
+            "grid": "".join(self.grid.codes[value] for value in self.grid.cells),
+            "materials": [self.materials.name(m) for m in used],
+            "modules": [[r.code, r.floor, r.row, r.col, r.name, pack(r.foundation), pack(r.walls), pack(r.ceiling),
+                         pack(r.roof), pack(r.furniture), [list(link) for link in r.links], int(r.top_floor)]
+                        for r in self.modules],
+        }, ensure_ascii=False, separators=(",", ":"))
+
+    @classmethod
+    def from_compact(cls, text: str, materials: MaterialTable = None):
+        data = json.loads(text)
+        floors, rows, cols = data["size"]
+        cells = data["grid"]
+        grid = FloorGrid.from_floors([[cells[(f * rows + r) * cols:(f * rows + r + 1) * cols] for r in range(rows)]
+                                      for f in range(floors)])
+        materials = materials or MaterialTable()
+        ids = [materials.intern(name) for name in data["materials"]]
+
+        def unpack(values):
+            return tuple(ids[v] for v in values)
+
+        modules = [ModuleRecord(code, floor, row, col, name, unpack(foundation), unpack(walls), unpack(ceiling),
+                                unpack(roof), unpack(furniture), tuple(tuple(link) for link in links), bool(top))
+                   for code, floor, row, col, name, foundation, walls, ceiling, roof, furniture, links, top
+                   in data["modules"]]
+        return cls(grid, modules, materials)
+
+
+def plan_from_layout(layout: str, materials: MaterialTable = None):
+    """
+    Parse the layout text into a BuildingPlan with one record per module cell and its neighbours.
+    Returns None if the layout is not a clean grid.
+    """
+    floors = parse_layout(layout)
+    if not floors:
+        return None
+    grid = FloorGrid.from_floors(floors)
+    modules = []
+    for code, floor, row, col in grid.positions():
+        above = grid.at(floor + 1, row, col)
+        modules.append(ModuleRecord(code, floor, row, col, links=tuple(grid.neighbours(floor, row, col)),
+                                    top_floor=above == EMPTY))
+    return BuildingPlan(grid, modules, materials or MaterialTable())
+
+
+def apply_connections(plan: BuildingPlan, connections: str) -> None:
+    """
+    Overwrite the plan's links and top-floor flags with a connections text ("1F", "A: north to $", ...,
+    "top-floor modules: A, C"), e.g. one produced by the model fallback.
+    """
+    floor = 0
+    for raw_line in connections.splitlines():
+        line = raw_line.strip().strip("'`")
+        label = FLOOR_LABEL.match(line)
+        if label:
+            floor = int(label.group(1)) - 1
+            continue
+        if line.lower().startswith("top-floor modules:"):
+            top = {code.strip() for code in line.split(":", 1)[1].split(",") if code.strip()}
+            for record in plan.modules:
+                if record.floor == floor:
+                    record.top_floor = record.code in top
+            continue
+        if ":" in line:
+            code, links = line.split(":", 1)
+            record = plan.module(code.strip(), floor)
+            if record is not None:
+                record.links = tuple((d.strip(), other.strip())
+                                     for d, other in re.findall(r"(north|south|east|west)\s+to\s+(\S+?)(?:,|$)", links))
+
+
+def json_text(value):
+    """value if the JSON held a non-empty string there, else None (null, numbers, lists and objects)."""
+    return value if isinstance(value, str) and value.strip() else None
+
+
+def apply_structure_json(plan: BuildingPlan, structure: dict) -> None:
+    """
+    Fill names and interned materials from the parsed structure JSON into the module records;
+    module entries that are not objects are skipped.
+    """
+    def texts(value):
+        if isinstance(value, dict):
+            value = list(value.values())
+        if isinstance(value, list):
+            return " ".join(texts(v) for v in value)
+        return json_text(value) or ""
+
+    def intern_all(value):
+        return tuple(plan.materials.intern(m) for m in MATERIAL_SPLIT.findall(texts(value).lower())
+                     if "_" in m or m in plan.materials.index)
+
+    modules = structure.get("modules")
+    for entry in modules if isinstance(modules, list) else []:
+        if not isinstance(entry, dict):
+            continue
+        code = (json_text(entry.get("code")) or "").strip()
+        roof = entry.get("roof") or {}
+        for record in plan.modules:
+            if record.code != code:
+                continue
+            record.name = json_text(entry.get("name")) or record.name
+            record.foundation = intern_all(entry.get("foundation"))
+            record.walls = intern_all(entry.get("walls"))
+            record.ceiling = intern_all(entry.get("ceiling"))
+            record.roof = intern_all(roof.get("material") if isinstance(roof, dict) else roof)
+            record.furniture = intern_all(entry.get("furniture_and_fixtures"))
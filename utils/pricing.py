@@ -0,0 +1,110 @@
+import os
+from dataclasses import dataclass
+
+
+@dataclass(frozen=True)
+class PriceTier:
+    """
+    USD per 1M tokens for prompts of up to max_prompt_tokens (None: any length). Thinking tokens are
+    billed as output; cached_input applies to the prompt tokens served from the context cache.
+    """
+    max_prompt_tokens: int
+    input: float
+    output: float
+    cached_input: float
+
+
+# Gemini API paid-tier prices, text input, per model and prompt-size tier.
+PRICES = {
+    "gemini-2.5-pro": (PriceTier(200_000, 1.25, 10.00, 0.31), PriceTier(None, 2.50, 15.00, 0.625)),
+    "gemini-2.5-flash": (PriceTier(None, 0.30, 2.50, 0.075),),
+    "gemini-2.5-flash-lite": (PriceTier(None, 0.10, 0.40, 0.025),),
+    "gemini-2.0-flash": (PriceTier(None, 0.10, 0.40, 0.025),),
+}
+
+
+def parse_price_overrides(text: str):
+    """{model name: (PriceTier,)} from "model=input/output/cached,..."; malformed entries are skipped with a warning."""
+    overrides = {}
+    for item in text.split(","):
+        if not item.strip():
+            continue
+        name, _, prices = item.partition("=")
+        try:
+            values = [float(price) for price in prices.split("/")]
+        except ValueError:
+            values = []
+        if not name.strip() or len(values) != 3:
+            print(f"Warning: ignoring LLM_PRICES entry '{item.strip()}' (expected model=input/output/cached).")
+            continue
+        overrides[name.strip()] = (PriceTier(None, *values),)
+    return overrides
+
+
+# Extra or corrected prices, e.g. LLM_PRICES="gemini-2.5-flash=0.30/2.50/0.075" (input/output/cached per 1M).
+PRICES.update(parse_price_overrides(os.getenv("LLM_PRICES", "")))
+
+# The token classes every usage dict carries once normalized, summed by add_usage.
+USAGE_KEYS = ("input_tokens", "output_tokens", "total_tokens", "cached_tokens", "reasoning_tokens", "cost")
+
+_unpriced = set()
+
+
+def model_prices(model_name: str):
+    """
+    The price tiers of a model, matching versioned names like gemini-2.5-flash-preview-05-20 by their
+    longest known prefix; None (with a warning) for a model that is not in the registry.
+    """
+    model_name = (model_name or "").removeprefix("models/")
+    matches = [name for name in PRICES if model_name.startswith(name)]
+    if matches:
+        return PRICES[max(matches, key=len)]
+    if model_name not in _unpriced:
+        _unpriced.add(model_name)
+        print(f"Warning: no price for model '{model_name}', its cost is counted as $0 (set LLM_PRICES).")
+    return None
+
+
+def price_tier(model_name: str, prompt_tokens: int):
+    tiers = model_prices(model_name)
+    if not tiers:
+        return None
+    return next(tier for tier in tiers if tier.max_prompt_tokens is None or prompt_tokens <= tier.max_prompt_tokens)
+
+
+def token_cost(model_name: str, input_tokens: int, output_tokens: int, cached_tokens: int = 0) -> float:
+    """USD for one request; the tier is picked by the request's prompt size."""
+    tier = price_tier(model_name, input_tokens)
+    if tier is None:
+        return 0.0
+    return ((input_tokens - cached_tokens) * tier.input + cached_tokens * tier.cached_input
+            + output_tokens * tier.output) / 1_000_000
+
+
+def normalize_usage(model_name: str, usage: dict) -> dict:
+    """
+    A response's usage_metadata as flat token counts (input includes cached, output includes thinking)
+    plus the request's cost.
+    """
+    input_tokens = usage.get("input_tokens", 0)
+    cached_tokens = (usage.get("input_token_details") or {}).get("cache_read", 0)
+    reasoning_tokens = (usage.get("output_token_details") or {}).get("reasoning", 0)
+    # Some client versions leave the thinking tokens out of output_tokens but not out of total_tokens.
+    output_tokens = max(usage.get("output_tokens", 0), usage.get("total_tokens", 0) - input_tokens)
+    return {
+        "input_tokens": input_tokens,
+        "output_tokens": output_tokens,
+        "total_tokens": input_tokens + output_tokens,
+        "cached_tokens": cached_tokens,
+        "reasoning_tokens": reasoning_tokens,
+        "cost": token_cost(model_name, input_tokens, output_tokens, cached_tokens),
+    }
+
+
+def describe_prices(model_name: str) -> str:
+    tiers = model_prices(model_name)
+    if not tiers:
+        return "unknown"
+    return "; ".join(f"Input ${tier.input:g}/1M | Output ${tier.output:g}/1M | Cached ${tier.cached_input:g}/1M"
+                     + (f" (prompts up to {tier.max_prompt_tokens // 1000}k tokens)" if tier.max_prompt_tokens else "")
+                     for tier in tiers)
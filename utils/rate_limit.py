@@ -0,0 +1,197 @@
+import asyncio
+import os
+import threading
+import time
+from collections import deque
+
+
+def parse_limits(text: str):
+    """{model name: limit} from "model=limit,model=limit"."""
+    return {name.strip(): int(limit) for name, limit in (item.split("=", 1) for item in text.split(",") if "=" in item)}
+
+
+# Requests per minute for every model, e.g. LLM_RPM=60; 0 means unlimited.
+DEFAULT_RPM = int(os.getenv("LLM_RPM", "0"))
+# Per-model overrides, e.g. LLM_RPM_LIMITS="gemini-2.5-pro=5,gemini-2.5-flash=15".
+RPM_LIMITS = parse_limits(os.getenv("LLM_RPM_LIMITS", ""))
+# Requests in flight at once over all models and all buildings, e.g. LLM_MAX_CONCURRENCY=8; 0 means unlimited.
+MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "0"))
+# Per-model caps on requests in flight, e.g. LLM_CONCURRENCY_LIMITS="gemini-2.5-pro=4".
+CONCURRENCY_LIMITS = parse_limits(os.getenv("LLM_CONCURRENCY_LIMITS", ""))
+
+
+class RateLimiter:
+    """
+    Sliding one-minute window: acquire() blocks until another request fits under the per-minute limit.
+    """
+
+    def __init__(self, requests_per_minute: int, window: float = 60.0):
+        self.limit = requests_per_minute
+        self.window = window
+        self.sent = deque()
+        self.lock = threading.Lock()
+
+    def reserve(self) -> float:
+        """Claim a slot and return how many seconds the caller has to wait before using it."""
+        with self.lock:
+            now = time.monotonic()
+            while self.sent and now - self.sent[0] >= self.window:
+                self.sent.popleft()
+            start = now
+            if len(self.sent) >= self.limit:
+                start = self.sent[-self.limit] + self.window
+            self.sent.append(start)
+            return start - now
+
+    def acquire(self) -> None:
+        if self.limit <= 0:
+            return
+        delay = self.reserve()
+        if delay > 0:
+            time.sleep(delay)
+
+    async def aacquire(self) -> None:
+        if self.limit <= 0:
+            return
+        delay = self.reserve()
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+
+_limiters = {}
+_limiters_lock = threading.Lock()
+
+
+def get_rate_limiter(model_name: str) -> RateLimiter:
+    model_name = (model_name or "").removeprefix("models/")
+    with _limiters_lock:
+        if model_name not in _limiters:
+            _limiters[model_name] = RateLimiter(RPM_LIMITS.get(model_name, DEFAULT_RPM))
+        return _limiters[model_name]
+
+
+class SharedSemaphore:
+    """
+    A semaphore that threads (acquire) and coroutines on any event loop (aacquire) wait on together,
+    first come first served. release() hands the slot straight to the next waiter, so a waiting
+    coroutine is woken once instead of polling and never holds up its event loop.
+    """
+
+    def __init__(self, value: int):
+        self.value = value
+        self.waiters = deque()
+        self.lock = threading.Lock()
+
+    def acquire(self) -> None:
+        with self.lock:
+            if self.value > 0 and not self.waiters:
+                self.value -= 1
+                return
+            granted = threading.Event()
+            self.waiters.append(granted)
+        try:
+            granted.wait()
+        except BaseException:
+            with self.lock:
+                if granted in self.waiters:
+                    self.waiters.remove(granted)
+            if granted.is_set():
+                self.release()
+            raise
+
+    async def aacquire(self) -> None:
+        with self.lock:
+            if self.value > 0 and not self.waiters:
+                self.value -= 1
+                return
+            loop = asyncio.get_running_loop()
+            granted = loop.create_future()
+            self.waiters.append((loop, granted))
+        try:
+            await granted
+        except BaseException:
+            with self.lock:
+                if (loop, granted) in self.waiters:
+                    self.waiters.remove((loop, granted))
+            # Cancelled after the slot was handed over: pass it on (a grant still queued does so itself).
+            if granted.done() and not granted.cancelled():
+                self.release()
+            raise
+
+    def release(self) -> None:
+        with self.lock:
+            while self.waiters:
+                waiter = self.waiters.popleft()
+                if isinstance(waiter, threading.Event):
+                    waiter.set()
+                    return
+                loop, granted = waiter
+                try:
+                    loop.call_soon_threadsafe(self._grant, granted)
+                    return
+                except RuntimeError:
+                    # That waiter's event loop is closed.
+                    continue
+            self.value += 1
+
+    def _grant(self, granted) -> None:
+        if granted.cancelled():
+            self.release()
+        else:
+            granted.set_result(None)
+
+
+class ConcurrencyLimit:
+    """
+    Caps the requests in flight with semaphores shared by threads ("with") and coroutines ("async with").
+    A caller interrupted while waiting gives back every slot it already holds.
+    """
+
+    def __init__(self, semaphores):
+        self.semaphores = [semaphore for semaphore in semaphores if semaphore is not None]
+
+    def __enter__(self):
+        acquired = []
+        try:
+            for semaphore in self.semaphores:
+                semaphore.acquire()
+                acquired.append(semaphore)
+        except BaseException:
+            for semaphore in reversed(acquired):
+                semaphore.release()
+            raise
+        return self
+
+    def __exit__(self, *exc_info):
+        for semaphore in reversed(self.semaphores):
+            semaphore.release()
+
+    async def __aenter__(self):
+        acquired = []
+        try:
+            for semaphore in self.semaphores:
+                await semaphore.aacquire()
+                acquired.append(semaphore)
+        except BaseException:
+            for semaphore in reversed(acquired):
+                semaphore.release()
+            raise
+        return self
+
+    async def __aexit__(self, *exc_info):
+        self.__exit__(*exc_info)
+
+
+_global_slots = SharedSemaphore(MAX_CONCURRENCY) if MAX_CONCURRENCY > 0 else None
+_concurrency_limits = {}
+
+
+def get_concurrency_limit(model_name: str) -> ConcurrencyLimit:
+    """The global cap plus the model's own cap (always acquired in that order, so they cannot deadlock)."""
+    model_name = (model_name or "").removeprefix("models/")
+    with _limiters_lock:
+        if model_name not in _concurrency_limits:
+            limit = CONCURRENCY_LIMITS.get(model_name, 0)
+            _concurrency_limits[model_name] = ConcurrencyLimit(
+                [_global_slots, SharedSemaphore(limit) if limit > 0 else None])
+        return _concurrency_limits[model_name]
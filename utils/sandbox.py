@@ -0,0 +1,192 @@
+import ast
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import traceback
+
+# Seconds a generated script may run before the check gives up on it.
+SANDBOX_TIMEOUT = float(os.getenv("SANDBOX_TIMEOUT", "60"))
+# Blocks a module may reach past its layout cell (eaves, outdoor decoration) and above the top floor (roofs).
+HORIZONTAL_MARGIN = 2
+ROOF_MARGIN_FLOORS = 1
+
+
+def run_generated_code(code_path: str, grid_size=None, timeout: float = SANDBOX_TIMEOUT) -> dict:
+    """
+    Execute a generated build script in a subprocess against a recording editor and return its report:
+    status, blocks, writes, per build_* function calls/time/writes, out-of-bounds writes and any exception.
+    grid_size is the layout's (floors, rows, cols), used to bound the building; None skips the bounds check.
+    """
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        report_path = os.path.join(tmp_dir, "report.json")
+        command = [sys.executable, "-m", "utils.sandbox", code_path, report_path]
+        if grid_size:
+            command += [str(v) for v in grid_size]
+        start = time.perf_counter()
+        try:
+            completed = subprocess.run(command, capture_output=True, text=True, timeout=timeout)
+        except subprocess.TimeoutExpired:
+            return {"status": "timeout", "duration": timeout, "error": f"Still running after {timeout:.0f}s"}
+
+        if not os.path.exists(report_path):
+            return {"status": "error", "duration": time.perf_counter() - start,
+                    "error": (completed.stderr or completed.stdout).strip()[-2000:]}
+        with open(report_path, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+
+def summarize_report(report: dict) -> str:
+    line = f"[Code Check] {report['status']}"
+    if "blocks" in report:
+        line += f": {report['blocks']} blocks from {report['writes']} writes in {report['duration']:.2f}s"
+    if report.get("out_of_bounds"):
+        line += f", {report['out_of_bounds']['count']} writes outside the layout"
+    if report.get("error"):
+        error = report["error"]
+        line += f"\n  {error if isinstance(error, str) else error['type'] + ': ' + error['message']}"
+        if isinstance(error, dict) and error.get("function"):
+            line += f" (in {error['function']}, line {error['line']})"
+    return line
+
+
+# ---------------------------------------------------------------------------------------------
+# Everything below runs inside the subprocess: python -m utils.sandbox CODE_PATH REPORT_PATH [F R C]
+# ---------------------------------------------------------------------------------------------
+
+def main_block_statements(tree: ast.Module):
+    """
+    The statements of the script's `if __name__ == '__main__':` block with try/except unwrapped, so the
+    build's own exception is seen instead of the script's catch-all print.
+    """
+    def unwrap(statements):
+        found = []
+        for statement in statements:
+            if isinstance(statement, ast.Try):
+                found.extend(unwrap(statement.body))
+            elif not (isinstance(statement, ast.Expr) and isinstance(statement.value, ast.Call)
+                      and getattr(statement.value.func, "id", "") == "print"):
+                found.append(statement)
+        return found
+
+    for statement in tree.body:
+        if (isinstance(statement, ast.If) and isinstance(statement.test, ast.Compare)
+                and getattr(statement.test.left, "id", "") == "__name__"):
+            return unwrap(statement.body)
+    return []
+
+
+def run_sandbox(code_path: str, grid_size=None) -> dict:
+    import numpy as np
+    import gdpc
+    import runtime.export
+    from runtime.voxel import VoxelEditor
+
+    stats = {}
+    stack = []
+    bounds = {}
+
+    class RecordingEditor(VoxelEditor):
+        """A VoxelEditor without a server: flushBuffer only counts what would have been placed."""
+
+        def __init__(self, *args, **kwargs):
+            self.editor = None
+            self.reset()
+            self.placed = 0
+
+        def record(self, low, high) -> None:
+            count = int(np.prod(np.asarray(high) - low + 1))
+            function = stack[-1][0] if stack else "<module>"
+            if stack:
+                stats[function]["writes"] += count
+            if "low" in bounds:
+                inside = np.clip(np.minimum(high, bounds["high"]) - np.maximum(low, bounds["low"]) + 1, 0, None)
+                outside = count - int(np.prod(inside))
+                if outside:
+                    bounds["by_function"][function] = bounds["by_function"].get(function, 0) + outside
+                    bounds["count"] += outside
+                    bounds.setdefault("first", [int(v) for v in low])
+
+        def fill(self, x1, y1, z1, x2, y2, z2, block) -> None:
+            super().fill(x1, y1, z1, x2, y2, z2, block)
+            self.record(np.minimum((x1, y1, z1), (x2, y2, z2)), np.maximum((x1, y1, z1), (x2, y2, z2)))
+
+        def placeBlock(self, position, block) -> None:
+            super().placeBlock(position, block)
+            self.record(np.asarray(position), np.asarray(position))
+
+        def flushBuffer(self) -> None:
+            self.placed += sum(len(coords) for _, coords in self.pending_blocks())
+            self.volume = None
+            self.origin = None
+
+    editor = RecordingEditor()
+    runtime.export.make_editor = lambda: editor
+    gdpc.Editor = lambda *args, **kwargs: editor
+
+    def profile(frame, event, arg):
+        name = frame.f_code.co_name
+        if frame.f_code.co_filename != code_path or not name.startswith("build_"):
+            return
+        if event == "call":
+            entry = stats.setdefault(name, {"calls": 0, "time": 0.0, "writes": 0})
+            entry["calls"] += 1
+            stack.append((name, time.perf_counter()))
+            # The first build_* function called from the main block is the master; its (x, y, z) anchors the layout.
+            if grid_size and "low" not in bounds and frame.f_back and frame.f_back.f_code.co_filename == code_path \
+                    and frame.f_back.f_code.co_name == "<module>":
+                values = list(frame.f_locals.values())[:3]
+                if len(values) < 3 or not all(isinstance(v, int) for v in values):
+                    return
+                width, length, height = (frame.f_globals.get(key, 0) for key in ("ROOM_WIDTH", "ROOM_LENGTH", "ROOM_HEIGHT"))
+                floors, rows, cols = grid_size
+                low = np.array(values) - [HORIZONTAL_MARGIN, 1, HORIZONTAL_MARGIN]
+                high = np.array(values) + [cols * width - 1 + HORIZONTAL_MARGIN,
+                                           (floors + ROOF_MARGIN_FLOORS) * height - 1,
+                                           rows * length - 1 + HORIZONTAL_MARGIN]
+                bounds.update(low=low, high=high, count=0, by_function={})
+        elif event == "return" and stack and stack[-1][0] == name:
+            _, started = stack.pop()
+            stats[name]["time"] += time.perf_counter() - started
+
+    with open(code_path, "r", encoding="utf-8") as f:
+        source = f.read()
+    tree = ast.parse(source, code_path)
+    module_globals = {"__name__": "__sandbox__", "__file__": code_path}
+    main_code = compile(ast.Module(body=main_block_statements(tree), type_ignores=[]), code_path, "exec")
+
+    report = {"status": "ok"}
+    start = time.perf_counter()
+    sys.setprofile(profile)
+    try:
+        exec(compile(tree, code_path, "exec"), module_globals)
+        exec(main_code, module_globals)
+    except Exception as e:
+        frames = [frame for frame in traceback.extract_tb(e.__traceback__) if frame.filename == code_path]
+        report["status"] = "error"
+        report["error"] = {"type": type(e).__name__, "message": str(e),
+                           "function": frames[-1].name if frames else None, "line": frames[-1].lineno if frames else None}
+    finally:
+        sys.setprofile(None)
+    editor.flushBuffer()
+
+    report.update({
+        "duration": time.perf_counter() - start,
+        "blocks": editor.placed,
+        "writes": editor.writes,
+        "functions": stats,
+    })
+    if "low" in bounds:
+        report["bounds"] = [bounds["low"].tolist(), bounds["high"].tolist()]
+        report["out_of_bounds"] = {key: bounds[key] for key in ("count", "by_function", "first") if key in bounds}
+    return report
+
+
+if __name__ == "__main__":
+    code_file, report_file = sys.argv[1], sys.argv[2]
+    size = tuple(int(v) for v in sys.argv[3:6]) if len(sys.argv) >= 6 else None
+    result = run_sandbox(os.path.abspath(code_file), size)
+    with open(report_file, "w", encoding="utf-8") as f:
+        json.dump(result, f, indent=2)
@@ -0,0 +1,228 @@
+import contextvars
+import json
+import os
+import secrets
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+
+# Where save_trace writes the Chrome trace and OpenTelemetry files; TRACE=0 turns the files off.
+TRACE_ENABLED = os.getenv("TRACE", "1") != "0"
+TRACE_DIR = os.getenv("TRACE_DIR", "generated/traces")
+SERVICE_NAME = "minecraft-llm-architect"
+
+# Span categories, outermost first: a batch holds buildings, a building its stages,
+# a stage its LLM calls and local parse/validation steps.
+BATCH, BUILDING, STAGE, LLM, PARSE = "batch", "building", "stage", "llm", "parse"
+
+
+@dataclass
+class Span:
+    """
+    One timed step. Start and end are wall-clock nanoseconds, so spans measured on different threads
+    and tasks line up on one timeline; attrs holds tokens, queue time, retries, time to first token etc.
+    """
+    name: str
+    category: str
+    trace_id: str
+    span_id: str
+    parent_id: str = None
+    start: int = 0
+    end: int = 0
+    thread: int = 0
+    attrs: dict = field(default_factory=dict)
+
+    @property
+    def duration(self) -> float:
+        return (self.end - self.start) / 1e9
+
+
+_current_span = contextvars.ContextVar("current_span", default=None)
+_children = {}
+_spans_lock = threading.Lock()
+
+
+@contextmanager
+def span(name: str, category: str, **attrs):
+    """
+    Time the body as a child of the current span (or as the root of a new trace). The current span follows
+    the context, so it is inherited by asyncio tasks and by threads started through run_in_context.
+    """
+    parent = _current_span.get()
+    current = Span(name, category, parent.trace_id if parent else secrets.token_hex(16), secrets.token_hex(8),
+                   parent.span_id if parent else None, time.time_ns(), thread=threading.get_ident(), attrs=attrs)
+    token = _current_span.set(current)
+    try:
+        yield current
+    except BaseException as e:
+        current.attrs["error"] = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        current.end = time.time_ns()
+        _current_span.reset(token)
+        with _spans_lock:
+            _children.setdefault(current.parent_id, []).append(current)
+
+
+def current_span():
+    return _current_span.get()
+
+
+def set_attributes(**attrs) -> None:
+    """Add attributes to the current span, if there is one."""
+    current = _current_span.get()
+    if current is not None:
+        current.attrs.update(attrs)
+
+
+def add_retry() -> None:
+    """Count one retry (a repair round, a re-prompt) on the current span."""
+    current = _current_span.get()
+    if current is not None:
+        current.attrs["retries"] = current.attrs.get("retries", 0) + 1
+
+
+def run_in_context(executor, func, *args):
+    """executor.submit(func, *args) with the caller's current span carried into the worker thread."""
+    return executor.submit(contextvars.copy_context().run, func, *args)
+
+
+def children(parent: Span, category: str = None):
+    """Finished child spans of parent in start order, optionally only those of one category."""
+    with _spans_lock:
+        found = list(_children.get(parent.span_id, []))
+    return sorted((s for s in found if category is None or s.category == category), key=lambda s: s.start)
+
+
+def descendants(root: Span):
+    """root and every finished span below it."""
+    found = [root]
+    for child in children(root):
+        found.extend(descendants(child))
+    return found
+
+
+def discard_trace(root: Span) -> None:
+    """Drop root's finished spans, so long batches do not keep every trace in memory."""
+    spans = descendants(root)
+    with _spans_lock:
+        for s in spans:
+            _children.pop(s.span_id, None)
+        siblings = _children.get(root.parent_id, [])
+        if root in siblings:
+            siblings.remove(root)
+
+
+def assign_lanes(spans):
+    """
+    {span_id: lane} such that the spans of one lane nest properly, which is what a Chrome trace track needs.
+    A span stays on its parent's lane unless a concurrent sibling already took it.
+    """
+    lanes = {}
+    open_spans = []  # per lane, the stack of spans still open at the current start time
+    by_id = {s.span_id: s for s in spans}
+    for s in sorted(spans, key=lambda s: (s.start, -s.end)):
+        candidates = [lanes[s.parent_id]] if s.parent_id in lanes else []
+        candidates += range(len(open_spans))
+        for lane in candidates:
+            stack = open_spans[lane]
+            while stack and stack[-1].end <= s.start:
+                stack.pop()
+            if not stack or (s.end <= stack[-1].end and is_ancestor(stack[-1], s, by_id)):
+                break
+        else:
+            lane = len(open_spans)
+            open_spans.append([])
+        open_spans[lane].append(s)
+        lanes[s.span_id] = lane
+    return lanes
+
+
+def is_ancestor(ancestor: Span, s: Span, by_id) -> bool:
+    while s.parent_id is not None:
+        if s.parent_id == ancestor.span_id:
+            return True
+        s = by_id.get(s.parent_id)
+        if s is None:
+            return False
+    return False
+
+
+def chrome_trace(spans) -> dict:
+    """
+    Chrome trace event JSON (chrome://tracing, Perfetto): one process per building, one track per lane
+    of overlapping work inside it, so parallel stages and calls show up side by side.
+    """
+    by_id = {s.span_id: s for s in spans}
+
+    def building_of(s):
+        while s.category not in (BUILDING, BATCH) and s.parent_id in by_id:
+            s = by_id[s.parent_id]
+        return s
+
+    pids = {}
+    events = []
+    for s in sorted(spans, key=lambda s: s.start):
+        owner = building_of(s)
+        if owner.span_id not in pids:
+            pids[owner.span_id] = len(pids) + 1
+            events.append({"name": "process_name", "ph": "M", "pid": pids[owner.span_id],
+                           "args": {"name": owner.name}})
+    lanes = {}
+    for owner_id in pids:
+        lanes.update(assign_lanes([s for s in spans if building_of(s).span_id == owner_id]))
+    for s in spans:
+        events.append({"name": s.name, "cat": s.category, "ph": "X", "ts": s.start / 1000,
+                       "dur": (s.end - s.start) / 1000, "pid": pids[building_of(s).span_id],
+                       "tid": lanes[s.span_id], "args": s.attrs})
+    return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+
+def otel_value(value) -> dict:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+def otel_trace(spans) -> dict:
+    """The spans as OTLP/JSON (the OpenTelemetry collector's file format), ready for Jaeger, Tempo etc."""
+    return {"resourceSpans": [{
+        "resource": {"attributes": [{"key": "service.name", "value": {"stringValue": SERVICE_NAME}}]},
+        "scopeSpans": [{
+            "scope": {"name": "utils.tracing"},
+            "spans": [{
+                "traceId": s.trace_id,
+                "spanId": s.span_id,
+                "parentSpanId": s.parent_id or "",
+                "name": s.name,
+                "kind": 1,
+                "startTimeUnixNano": str(s.start),
+                "endTimeUnixNano": str(s.end),
+                "attributes": [{"key": "category", "value": {"stringValue": s.category}}]
+                              + [{"key": key, "value": otel_value(value)} for key, value in s.attrs.items()],
+                "status": {"code": 2, "message": s.attrs["error"]} if "error" in s.attrs else {"code": 1},
+            } for s in spans],
+        }],
+    }]}
+
+
+def save_trace(root: Span, name: str):
+    """
+    Write root's trace as TRACE_DIR/<name>.trace.json (Chrome) and <name>.otel.json (OpenTelemetry)
+    and return the Chrome trace path, or None when tracing files are turned off.
+    """
+    if not TRACE_ENABLED:
+        return None
+    spans = descendants(root)
+    os.makedirs(TRACE_DIR, exist_ok=True)
+    chrome_path = os.path.join(TRACE_DIR, f"{name}.trace.json")
+    with open(chrome_path, "w", encoding="utf-8") as f:
+        json.dump(chrome_trace(spans), f, ensure_ascii=False)
+    with open(os.path.join(TRACE_DIR, f"{name}.otel.json"), "w", encoding="utf-8") as f:
+        json.dump(otel_trace(spans), f, ensure_ascii=False)
+    return chrome_path